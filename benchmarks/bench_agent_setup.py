@@ -0,0 +1,87 @@
+"""Micro-benchmark do custo de preparação do agente por chamada de /ask.
+
+Compara o fluxo antigo, que recriava o agente e o AgentExecutor a cada
+pergunta, com o fluxo atual, que reutiliza o executor criado no __init__
+e apenas monta o input com o histórico da conversa.
+
+Não faz chamadas ao LLM nem ao banco. Uso:
+
+    python -m benchmarks.bench_agent_setup [iteracoes]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from langchain.agents import create_openai_tools_agent, AgentExecutor
+from langchain.memory import ConversationBufferWindowMemory
+from src.ai_agent.ai_agent import CargaAIAgent
+from src.ai_agent.tools import TOOLS
+
+
+def _make_memory(turns: int = 10) -> ConversationBufferWindowMemory:
+    memory = ConversationBufferWindowMemory(
+        k=10,
+        return_messages=True,
+        memory_key="chat_history"
+    )
+    for i in range(turns):
+        memory.chat_memory.add_user_message(f"Qual o status da carga OFR-{i:03d}?")
+        memory.chat_memory.add_ai_message(f"A carga OFR-{i:03d} está em trânsito.")
+    return memory
+
+
+def setup_per_request(agent: CargaAIAgent, memory: ConversationBufferWindowMemory):
+    agent_with_memory = create_openai_tools_agent(
+        llm=agent.llm,
+        tools=TOOLS,
+        prompt=agent.prompt
+    )
+    return AgentExecutor(
+        agent=agent_with_memory,
+        tools=TOOLS,
+        memory=memory,
+        verbose=True,
+        handle_parsing_errors=True,
+        max_iterations=5
+    )
+
+
+def setup_shared(agent: CargaAIAgent, memory: ConversationBufferWindowMemory):
+    return agent._build_agent_input("owner", "user", "Status da carga OFR-001?", memory)
+
+
+def _measure(label: str, fn, agent: CargaAIAgent, iterations: int):
+    memory = _make_memory()
+    fn(agent, memory)
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(agent, memory)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    for _ in range(min(iterations, 200)):
+        fn(agent, memory)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    per_call_us = elapsed / iterations * 1_000_000
+    print(f"{label:<28} {per_call_us:>10.1f} us/chamada  pico alocado: {peak / 1024:>8.1f} KiB")
+    return per_call_us
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    agent = CargaAIAgent()
+
+    print(f"Iterações: {iterations}")
+    before = _measure("antes (executor por pedido)", setup_per_request, agent, iterations)
+    after = _measure("depois (executor reutilizado)", setup_shared, agent, iterations)
+    print(f"Ganho: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
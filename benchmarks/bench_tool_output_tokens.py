@@ -0,0 +1,192 @@
+"""Tokens das saídas das ferramentas nos formatos "text" e "compact".
+
+Executa cada ferramenta e conta os tokens da saída com o tiktoken, no encoding
+de MEMORY_TOKEN_ENCODING. Essas saídas voltam ao LLM no mesmo turno e a
+resposta gerada a partir delas fica na memória da conversa.
+
+Sem --owner-id, as ferramentas leem as cargas de benchmarks/fixtures/cargas.json
+(ou do arquivo em --fixture), sem banco, para reproduzir os números. Com
+--owner-id, consultam o banco (DATABASE_URL) para esse owner. Uso:
+
+    python -m benchmarks.bench_tool_output_tokens [--fixture cargas.json]
+    python -m benchmarks.bench_tool_output_tokens --owner-id <uuid> [--codigos OFR-001,OFR-002]
+"""
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+import argparse
+import asyncio
+import json
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from src.ai_agent import tools
+from src.ai_agent.token_budget import count_tokens, load_encoding
+from src.ai_agent.tool_format import output_format
+from src.ai_agent.tools import (
+    search_carga_by_identifier,
+    search_cargas_by_status,
+    count_cargas_by_status,
+    list_all_cargas,
+    get_carga_details,
+)
+from src.db.database import db_manager
+from src.models.models import CargaResult
+
+FORMATS = ["text", "compact"]
+DEFAULT_FIXTURE = Path(__file__).parent / "fixtures" / "cargas.json"
+FIXTURE_OWNER_ID = "fixture"
+
+
+class FixtureDatabase:
+    """Leituras do DatabaseManager usadas pelas ferramentas, sobre as cargas do fixture."""
+
+    def __init__(self, cargas: List[CargaResult]):
+        self.cargas = cargas
+
+    def _by_status(self, status: Optional[str]) -> List[CargaResult]:
+        return [carga for carga in self.cargas
+                if status is None or (carga.status or "").upper() == status.upper()]
+
+    def _matches(self, carga: CargaResult, identifier: str) -> bool:
+        values = [carga.codigo, carga.pedido_embarcador]
+        values += [value for doc in carga.documentos for value in (doc.numero, doc.chave)]
+        return any(identifier.upper() in (value or "").upper() for value in values)
+
+    async def search_cargas_by_identifiers(self, identifiers: List[str],
+                                           owner_id: str) -> Dict[str, List[CargaResult]]:
+        results = {}
+        for identifier in dict.fromkeys(identifiers):
+            exact = [carga for carga in self.cargas if carga.codigo == identifier]
+            results[identifier] = exact or [
+                carga for carga in self.cargas if self._matches(carga, identifier)]
+        return results
+
+    async def search_cargas_by_status(self, status: str, owner_id: str,
+                                      limit: Optional[int] = None) -> List[CargaResult]:
+        return self._by_status(status)[:limit]
+
+    async def count_cargas_by_status(self, status: str, owner_id: str) -> int:
+        return len(self._by_status(status))
+
+    async def get_status_summary(self, owner_id: str, status: Optional[str] = None,
+                                 by_estado: bool = False, limit: int = 50) -> List[Dict[str, Any]]:
+        cargas = self._by_status(status)
+        groups = Counter(
+            (carga.status, carga.estado_destinatario if by_estado else None) for carga in cargas)
+        ordered = sorted(groups.items(), key=lambda item: (-item[1], item[0][0] or "", item[0][1] or ""))
+        return [{
+            "status": group_status,
+            "estado_destinatario": estado,
+            "total": total,
+            "total_cargas": len(cargas),
+            "total_grupos": len(groups),
+        } for (group_status, estado), total in ordered[:limit]]
+
+    async def get_cargas_page_by_owner(self, owner_id: str, limit: int = 50,
+                                       after: Optional[str] = None) -> Tuple[List[CargaResult], Optional[str]]:
+        return self.cargas[:limit], None
+
+    async def count_cargas_by_owner(self, owner_id: str) -> int:
+        return len(self.cargas)
+
+
+def _load_fixture(path: Path) -> List[CargaResult]:
+    with open(path, encoding="utf-8") as f:
+        return [CargaResult(**row) for row in json.load(f)]
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--owner-id",
+                        help="owner consultado no banco; sem ele, usa o fixture")
+    parser.add_argument("--fixture", type=Path, default=DEFAULT_FIXTURE,
+                        help="JSON com as cargas (formato de CargaResult) usado sem --owner-id")
+    parser.add_argument("--codigos", default="OFR-001,OFR-002",
+                        help="códigos de carga existentes, separados por vírgula")
+    parser.add_argument("--status", default="em_transito")
+    parser.add_argument("--limit", type=int, default=20,
+                        help="limite do list_all_cargas")
+    parser.add_argument("--json", action="store_true",
+                        help="imprime o resultado em JSON")
+    return parser.parse_args()
+
+
+def _cases(args: argparse.Namespace) -> List[Tuple[str, Any, Dict[str, Any]]]:
+    codigos = [codigo.strip() for codigo in args.codigos.split(",") if codigo.strip()]
+    owner_id = args.owner_id or FIXTURE_OWNER_ID
+    return [
+        ("search_carga_by_identifier (1)", search_carga_by_identifier,
+         {"identifiers": codigos[:1], "owner_id": owner_id}),
+        (f"search_carga_by_identifier ({len(codigos)})", search_carga_by_identifier,
+         {"identifiers": codigos, "owner_id": owner_id}),
+        ("get_carga_details (1)", get_carga_details,
+         {"codigos": codigos[:1], "owner_id": owner_id}),
+        (f"get_carga_details ({len(codigos)})", get_carga_details,
+         {"codigos": codigos, "owner_id": owner_id}),
+        ("search_cargas_by_status", search_cargas_by_status,
+         {"status": args.status, "owner_id": owner_id}),
+        ("count_cargas_by_status (por UF)", count_cargas_by_status,
+         {"owner_id": owner_id, "by_estado": True}),
+        (f"list_all_cargas ({args.limit})", list_all_cargas,
+         {"owner_id": owner_id, "limit": args.limit}),
+    ]
+
+
+async def _measure(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    results = []
+    for label, tool, tool_args in _cases(args):
+        tokens = {}
+        for name in FORMATS:
+            with output_format(name):
+                output = await tool.ainvoke(tool_args)
+            tokens[name] = count_tokens(output)
+        results.append({"case": label, **tokens})
+    return results
+
+
+async def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    if not args.owner_id:
+        # As ferramentas leem tools.db_manager; no modo fixture ele vira o FixtureDatabase.
+        tools.db_manager = FixtureDatabase(_load_fixture(args.fixture))
+        try:
+            return await _measure(args)
+        finally:
+            tools.db_manager = db_manager
+
+    await db_manager.connect()
+    try:
+        return await _measure(args)
+    finally:
+        await db_manager.disconnect()
+
+
+def _print_report(results: List[Dict[str, Any]]):
+    if load_encoding() is None:
+        print("Aviso: encoding do tiktoken indisponível, tokens estimados por caracteres")
+
+    print(f"{'caso':<36} {'text':>8} {'compact':>8} {'redução':>8}")
+    for result in results:
+        text, compact = result["text"], result["compact"]
+        reduction = f"{(1 - compact / text) * 100:.0f}%" if text else "-"
+        print(f"{result['case']:<36} {text:>8} {compact:>8} {reduction:>8}")
+
+    text_total = sum(result["text"] for result in results)
+    compact_total = sum(result["compact"] for result in results)
+    if text_total:
+        print(f"{'total':<36} {text_total:>8} {compact_total:>8} "
+              f"{(1 - compact_total / text_total) * 100:>7.0f}%")
+
+
+def main():
+    args = _parse_args()
+    results = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False))
+    else:
+        _print_report(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Teste de carga do /ask com a API rodando no próprio processo.
+
+Sobe a aplicação FastAPI (lifespan incluso) e dispara as perguntas pelo
+httpx com ASGITransport, sem abrir porta. As requisições saem em taxa fixa
+(--rps), sem esperar as anteriores terminarem, e ao final são mostrados
+latência p50/p95/p99, vazão e taxa de erros.
+
+Por padrão usa o LLM fake (LLM_PROVIDER=fake, latência em
+FAKE_LLM_LATENCY_SECONDS), então não precisa de rede nem da OpenAI; o banco
+(DATABASE_URL) e o Redis são os configurados no ambiente. Uso:
+
+    python -m benchmarks.load_test_ask --owner-id <uuid> [--rps 20] [--duration 30]
+"""
+import os
+
+os.environ.setdefault("LLM_PROVIDER", "fake")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+import httpx
+from src.api import app
+
+DEFAULT_CODIGOS = ["OFR-001", "OFR-002"]
+DEFAULT_QUESTIONS = [
+    "Qual o status da carga {codigo}?",
+    "Qual a cidade de destino da carga {codigo}?",
+    "Mostre os documentos da carga {codigo} e o remetente",
+    "Quantas cargas estão em trânsito?",
+    "Mostre cargas disponíveis",
+    "Preciso de um resumo das minhas cargas",
+]
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--owner-id", required=True)
+    parser.add_argument("--rps", type=float, default=20,
+                        help="requisições disparadas por segundo")
+    parser.add_argument("--duration", type=float, default=30,
+                        help="segundos disparando requisições")
+    parser.add_argument("--users", type=int, default=50,
+                        help="user_ids distintos (conversas)")
+    parser.add_argument("--endpoint", choices=["/ask", "/ask/stream"], default="/ask")
+    parser.add_argument("--codigos", default=",".join(DEFAULT_CODIGOS),
+                        help="códigos de carga usados nas perguntas, separados por vírgula")
+    parser.add_argument("--questions",
+                        help="arquivo com uma pergunta por linha ({codigo} é substituído)")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--json", action="store_true",
+                        help="imprime o resumo em JSON")
+    return parser.parse_args()
+
+
+def _load_questions(args: argparse.Namespace) -> List[str]:
+    templates = DEFAULT_QUESTIONS
+    if args.questions:
+        with open(args.questions, encoding="utf-8") as f:
+            templates = [line.strip() for line in f if line.strip()]
+
+    codigos = [codigo.strip() for codigo in args.codigos.split(",") if codigo.strip()]
+    return [template.format(codigo=codigo) for codigo in codigos for template in templates]
+
+
+async def _send(client: httpx.AsyncClient, endpoint: str, payload: Dict[str, Any],
+                timeout: float) -> Tuple[float, Optional[str]]:
+    """Retorna (latência em segundos, erro ou None)."""
+    start = time.perf_counter()
+    try:
+        response = await client.post(endpoint, json=payload, timeout=timeout)
+        error = None
+        if response.status_code != 200:
+            error = f"HTTP {response.status_code}"
+        elif endpoint == "/ask/stream" and "event: error" in response.text:
+            error = "evento error"
+    except Exception as e:
+        error = type(e).__name__
+    return time.perf_counter() - start, error
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, round(percent / 100 * len(values)) - 1))
+    return values[index]
+
+
+async def run_load(args: argparse.Namespace) -> Dict[str, Any]:
+    questions = _load_questions(args)
+    total = int(args.rps * args.duration)
+    interval = 1 / args.rps
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+            tasks = []
+            start = time.perf_counter()
+            for i in range(total):
+                delay = start + i * interval - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+                payload = {
+                    "question": questions[(i // args.users) % len(questions)],
+                    "owner_id": args.owner_id,
+                    "user_id": f"loadtest-{i % args.users}",
+                }
+                tasks.append(asyncio.create_task(
+                    _send(client, args.endpoint, payload, args.timeout)))
+
+            results = await asyncio.gather(*tasks)
+            elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for latency, _ in results)
+    errors = Counter(error for _, error in results if error)
+    failed = sum(errors.values())
+
+    return {
+        "endpoint": args.endpoint,
+        "target_rps": args.rps,
+        "requests": total,
+        "elapsed_seconds": round(elapsed, 2),
+        "throughput_rps": round((total - failed) / elapsed, 2) if elapsed else 0.0,
+        "error_rate": round(failed / total, 4) if total else 0.0,
+        "errors": dict(errors),
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 50) * 1000, 1),
+            "p95": round(_percentile(latencies, 95) * 1000, 1),
+            "p99": round(_percentile(latencies, 99) * 1000, 1),
+            "max": round(latencies[-1] * 1000, 1) if latencies else 0.0,
+        },
+    }
+
+
+def _print_report(report: Dict[str, Any]):
+    latency = report["latency_ms"]
+    print(f"Endpoint: {report['endpoint']}  alvo: {report['target_rps']} req/s")
+    print(f"Requisições: {report['requests']} em {report['elapsed_seconds']} s")
+    print(f"Vazão (sucessos): {report['throughput_rps']} req/s")
+    print(f"Taxa de erros: {report['error_rate'] * 100:.2f}%  {report['errors'] or ''}")
+    print(f"Latência (ms): p50 {latency['p50']}  p95 {latency['p95']}  "
+          f"p99 {latency['p99']}  máx {latency['max']}")
+
+
+def main():
+    args = _parse_args()
+    report = asyncio.run(run_load(args))
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False))
+    else:
+        _print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,7 @@ settings.setup_logging()
 
 if __name__ == "__main__":
     logger = settings.setup_logging()
-    logger.info(f"Iniciando servidor em {settings.HOST}:{settings.PORT}")
+    logger.info("Iniciando servidor em %s:%s", settings.HOST, settings.PORT)
 
     uvicorn.run(
         "main:app",
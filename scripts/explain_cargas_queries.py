@@ -0,0 +1,96 @@
+"""Verifica via EXPLAIN se as consultas de cargas usam os índices das migrações.
+
+Roda cada consulta do DatabaseManager com `enable_seqscan = off`, para que o
+resultado não dependa do tamanho das tabelas, e falha se o plano ainda tiver
+Seq Scan em oferta_carga ou carga_documento. Uso:
+
+    python -m scripts.explain_cargas_queries
+"""
+import asyncio
+import json
+import sys
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Set, Tuple
+from src.config import settings
+from src.db.database import (
+    db_manager,
+    identifier_lookup_tiers,
+    QUERIES,
+    CARGAS_FIRST_PAGE_BY_OWNER_QUERY,
+    CARGAS_PAGE_AFTER_BY_OWNER_QUERY,
+    COUNT_CARGAS_BY_OWNER_QUERY,
+    CARGAS_BY_STATUS_QUERY,
+    COUNT_CARGAS_BY_STATUS_QUERY,
+    STATUS_SUMMARY_QUERY,
+    STATUS_ESTADO_SUMMARY_QUERY,
+)
+
+CHECKED_TABLES = {"oferta_carga", "carga_documento"}
+SAMPLE_CHAVE = "35240812345678901234567890123456789012345678"
+
+
+def _walk(plan: Dict[str, Any], seq_scans: Set[str], indexes: Set[str]):
+    if plan.get("Node Type") == "Seq Scan":
+        seq_scans.add(plan.get("Relation Name"))
+    if plan.get("Index Name"):
+        indexes.add(plan["Index Name"])
+    for child in plan.get("Plans", []):
+        _walk(child, seq_scans, indexes)
+
+
+def _queries(owner_id: str) -> List[Tuple[str, str, List[Any]]]:
+    queries = [
+        ("cargas_first_page_by_owner", CARGAS_FIRST_PAGE_BY_OWNER_QUERY,
+         [owner_id, 51]),
+        ("cargas_page_after_by_owner", CARGAS_PAGE_AFTER_BY_OWNER_QUERY,
+         [owner_id, datetime.now(timezone.utc), uuid.uuid4(), 51]),
+        ("count_cargas_by_owner", COUNT_CARGAS_BY_OWNER_QUERY, [owner_id]),
+        ("cargas_by_status", CARGAS_BY_STATUS_QUERY, [owner_id, "em_transito", 10]),
+        ("count_cargas_by_status", COUNT_CARGAS_BY_STATUS_QUERY, [owner_id, "em_transito"]),
+        ("status_summary", STATUS_SUMMARY_QUERY, [owner_id, None, 50]),
+        ("status_estado_summary", STATUS_ESTADO_SUMMARY_QUERY, [owner_id, None, 50]),
+    ]
+    for sample in ("OFR-001", SAMPLE_CHAVE):
+        for tier, _, param in identifier_lookup_tiers(sample):
+            queries.append((
+                f"search_carga_by_identifier[{tier}]",
+                QUERIES[f"identifier_{tier}"],
+                [owner_id, param]
+            ))
+    return queries
+
+
+async def main() -> int:
+    logger = settings.setup_logging()
+    owner_id = str(uuid.uuid4())
+    failures = 0
+
+    await db_manager.connect()
+    try:
+        async with db_manager.pool.acquire() as connection:
+            async with connection.transaction():
+                await connection.execute("SET LOCAL enable_seqscan = off")
+                for name, query, params in _queries(owner_id):
+                    plan = await connection.fetchval(
+                        f"EXPLAIN (FORMAT JSON) {query}", *params)
+                    if isinstance(plan, str):
+                        plan = json.loads(plan)
+
+                    seq_scans: Set[str] = set()
+                    indexes: Set[str] = set()
+                    _walk(plan[0]["Plan"], seq_scans, indexes)
+
+                    bad = seq_scans & CHECKED_TABLES
+                    status = "FALHOU" if bad else "ok"
+                    logger.info(
+                        "%-6s %s: índices=%s seq_scan=%s", status, name, sorted(indexes), sorted(bad))
+                    failures += bool(bad)
+    finally:
+        await db_manager.disconnect()
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
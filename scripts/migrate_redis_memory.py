@@ -0,0 +1,31 @@
+"""Converte memórias legadas (blob JSON via SETEX) para o formato de lista.
+
+As chaves antigas também são migradas sob demanda na primeira leitura ou
+escrita, mas este script permite converter todas de uma vez e também
+preenche o índice de usuários por owner usado pelas rotas /memory. Uso:
+
+    python -m scripts.migrate_redis_memory
+"""
+import asyncio
+from src.config import settings
+from src.ai_agent.memory_manager import AsyncRedisMemoryManager
+
+
+async def main():
+    logger = settings.setup_logging()
+
+    manager = AsyncRedisMemoryManager(storage="list")
+    await manager.connect()
+    if not manager.is_connected():
+        logger.error("Redis não conectado, nada foi migrado")
+        return
+
+    try:
+        migrated = await manager.migrate_legacy_memories()
+        logger.info("%s memórias migradas para lista", migrated)
+    finally:
+        await manager.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
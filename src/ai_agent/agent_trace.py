@@ -0,0 +1,27 @@
+import logging
+from typing import Any
+from langchain_core.agents import AgentAction, AgentFinish
+from langchain_core.callbacks import BaseCallbackHandler
+
+logger = logging.getLogger(__name__)
+
+
+class AgentTraceCallbackHandler(BaseCallbackHandler):
+    """Registra em DEBUG os passos do agente, no lugar do verbose=True no stdout.
+
+    Usado só numa amostra das perguntas (AGENT_TRACE_SAMPLE_RATE).
+    """
+
+    run_inline = True
+
+    def on_agent_action(self, action: AgentAction, **kwargs: Any) -> Any:
+        logger.debug("Agente chamou %s com %s", action.tool, action.tool_input)
+
+    def on_tool_end(self, output: str, **kwargs: Any) -> Any:
+        logger.debug("Ferramenta %s retornou: %s", kwargs.get("name"), output)
+
+    def on_agent_finish(self, finish: AgentFinish, **kwargs: Any) -> Any:
+        logger.debug("Agente respondeu: %s", finish.return_values.get("output"))
+
+
+agent_trace_handler = AgentTraceCallbackHandler()
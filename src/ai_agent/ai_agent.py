@@ -1,15 +1,27 @@
-import os
+import asyncio
 from dotenv import load_dotenv
 import json
 import logging
-from typing import Dict, List, Any, Optional
-from langchain_openai import ChatOpenAI
+import random
+from typing import Dict, List, Any, Optional, Tuple, AsyncIterator
+from langchain_core.language_models import BaseChatModel
 from langchain.agents import create_openai_tools_agent, AgentExecutor
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
 from langchain.memory import ConversationBufferWindowMemory
-from src.ai_agent.tools import TOOLS
-from src.ai_agent.memory_manager import RedisMemoryManager
+from langchain_core.callbacks import BaseCallbackHandler
+from src.ai_agent.tools import TOOLS, collected_cargas, start_tool_turn
+from src.ai_agent.memory_manager import RedisMemoryManager, AsyncRedisMemoryManager
+from src.ai_agent.token_budget import TokenBudgetWindowMemory, load_encoding
+from src.ai_agent.answer_cache import AnswerCache
+from src.ai_agent.intent_router import answer_routed_question
+from src.ai_agent.llm import create_llm
+from src.ai_agent.conversation_guard import ConversationGuard, ConversationBusyError
+from src.ai_agent.compaction import ConversationCompactor
+from src.db.database import db_manager
+from src.ai_agent.agent_trace import agent_trace_handler
+from src.metrics import ASK_STAGE_SECONDS, metrics_handler
+from src.config import settings
 
 load_dotenv()
 
@@ -18,16 +30,19 @@ logger = logging.getLogger(__name__)
 
 class CargaAIAgent:
     def __init__(self):
-        self.llm = ChatOpenAI(
-            model="gpt-4o-mini",
-            temperature=0.1,
-            api_key=os.getenv("OPENAI_API_KEY")
-        )
+        self.llm = create_llm()
 
-        self.memory_manager = RedisMemoryManager(memory_window=10)
+        if settings.REDIS_ASYNC:
+            self.memory_manager = AsyncRedisMemoryManager(memory_window=10)
+        else:
+            self.memory_manager = RedisMemoryManager(memory_window=10)
 
         self.user_memories: Dict[str, ConversationBufferWindowMemory] = {}
 
+        self.answer_cache = AnswerCache() if settings.ANSWER_CACHE_ENABLED else None
+        self.conversation_guard = ConversationGuard(self.memory_manager)
+        self.compactor = ConversationCompactor(self.memory_manager, self.llm)
+
         self.memory_window = 10
 
         self.prompt = ChatPromptTemplate.from_messages([
@@ -38,8 +53,9 @@ Sua função é ajudar usuários a encontrar informações sobre cargas usando a
 FERRAMENTAS DISPONÍVEIS:
 - search_carga_by_identifier: Busca carga por código, número de documento, chave ou pedido
 - search_cargas_by_status: Busca cargas por status específico
+- count_cargas_by_status: Conta cargas por status (e opcionalmente por estado de destino), sem listá-las
 - list_all_cargas: Lista todas as cargas do proprietário
-- get_carga_details: Obtém detalhes completos de uma carga específica
+- get_carga_details: Obtém detalhes completos de uma ou mais cargas
 
 INSTRUÇÕES:
 1. Analise a pergunta do usuário cuidadosamente
@@ -47,13 +63,16 @@ INSTRUÇÕES:
 3. Extraia os parâmetros necessários (identificador, status, owner_id)
 4. Use a ferramenta apropriada
 5. Se necessário, use múltiplas ferramentas para obter informações completas
-6. Forneça uma resposta clara e organizada
+6. Para várias cargas, passe todos os códigos numa única chamada da ferramenta
+7. Forneça uma resposta clara e organizada
 
 EXEMPLOS DE USO:
 - "Qual o status da carga D-ABCD?" → use search_carga_by_identifier
 - "Mostre cargas disponíveis" → use search_cargas_by_status com status="disponivel"
+- "Quantas cargas estão em trânsito?" → use count_cargas_by_status com status="em_transito"
 - "Liste todas as cargas" → use list_all_cargas
 - "Detalhes da carga D-ABCD" → use get_carga_details
+- "Compare as cargas D-ABCD e D-EFGH" → use get_carga_details com codigos=["D-ABCD", "D-EFGH"]
 
 Seja sempre útil e forneça informações completas e organizadas.
             """),
@@ -62,154 +81,339 @@ Seja sempre útil e forneça informações completas e organizadas.
             MessagesPlaceholder(variable_name="agent_scratchpad"),
         ])
 
-        self.agent = create_openai_tools_agent(
-            llm=self.llm,
+        self.agent_executor = self._build_executor(self.llm)
+
+        # O /ask/stream usa um LLM em streaming para emitir os tokens da resposta.
+        self.streaming_llm = create_llm(streaming=True)
+        self.streaming_agent_executor = self._build_executor(self.streaming_llm)
+
+    def _build_executor(self, llm: BaseChatModel) -> AgentExecutor:
+        agent = create_openai_tools_agent(
+            llm=llm,
             tools=TOOLS,
             prompt=self.prompt
         )
 
-        self.agent_executor = AgentExecutor(
-            agent=self.agent,
+        return AgentExecutor(
+            agent=agent,
             tools=TOOLS,
-            verbose=True,
+            verbose=settings.AGENT_VERBOSE,
             handle_parsing_errors=True,
             max_iterations=5
         )
 
-    def _get_user_memory(self, owner_id: str, user_id: str) -> ConversationBufferWindowMemory:
+    async def connect(self):
+        await asyncio.to_thread(load_encoding)
+        if isinstance(self.memory_manager, AsyncRedisMemoryManager):
+            await self.memory_manager.connect()
+        if self.answer_cache:
+            await self.answer_cache.connect()
+            db_manager.add_change_listener(self.answer_cache.bump_owner_version)
+
+    async def disconnect(self):
+        await self.compactor.close()
+        if isinstance(self.memory_manager, AsyncRedisMemoryManager):
+            await self.memory_manager.disconnect()
+        if self.answer_cache:
+            await self.answer_cache.disconnect()
+
+    def _answer_cache_available(self) -> bool:
+        # Sem o LISTEN no banco os carimbos de versão não avançam e a
+        # resposta em cache poderia estar desatualizada.
+        return (self.answer_cache is not None
+                and self.answer_cache.is_connected()
+                and db_manager.notifications_active)
+
+    def _run_callbacks(self) -> List[BaseCallbackHandler]:
+        callbacks = [metrics_handler]
+        if (settings.AGENT_TRACE_SAMPLE_RATE
+                and logger.isEnabledFor(logging.DEBUG)
+                and random.random() < settings.AGENT_TRACE_SAMPLE_RATE):
+            callbacks.append(agent_trace_handler)
+        return callbacks
+
+    async def _get_user_memory(self, owner_id: str, user_id: str) -> ConversationBufferWindowMemory:
         memory_key = f"{owner_id}:{user_id}"
 
         if self.memory_manager.is_connected():
-            return self.memory_manager.get_user_memory(memory_key)
+            return await self.memory_manager.get_user_memory(memory_key)
 
         if memory_key not in self.user_memories:
-            self.user_memories[memory_key] = ConversationBufferWindowMemory(
+            self.user_memories[memory_key] = TokenBudgetWindowMemory(
                 k=self.memory_window,
+                max_token_limit=settings.MEMORY_TOKEN_BUDGET,
                 return_messages=True,
                 memory_key="chat_history"
             )
             logger.info(
-                f"Criada nova memória de contexto em RAM para owner_id: {owner_id}, user_id: {user_id}")
+                "Criada nova memória de contexto em RAM para owner_id: %s, user_id: %s", owner_id, user_id)
 
         return self.user_memories[memory_key]
 
-    def _create_agent_with_memory(self, owner_id: str, user_id: str, user_memory: ConversationBufferWindowMemory) -> AgentExecutor:
-        logger.info(
-            f"Memória criada para owner_id: {owner_id}, user_id: {user_id}, mensagens: {len(user_memory.chat_memory.messages)}")
+    def _build_agent_input(self, owner_id: str, user_id: str, question: str, user_memory: ConversationBufferWindowMemory) -> Dict[str, Any]:
+        chat_history = user_memory.load_memory_variables({})["chat_history"]
+        logger.debug(
+            "Memória carregada para owner_id: %s, user_id: %s, mensagens: %s", owner_id, user_id, len(chat_history))
 
-        agent_with_memory = create_openai_tools_agent(
-            llm=self.llm,
-            tools=TOOLS,
-            prompt=self.prompt
-        )
+        contextual_question = f"Pergunta: {question}\n\nContexto: O owner_id é '{owner_id}'. Use este owner_id em todas as buscas no banco de dados."
 
-        agent_executor = AgentExecutor(
-            agent=agent_with_memory,
-            tools=TOOLS,
-            memory=user_memory,
-            verbose=True,
-            handle_parsing_errors=True,
-            max_iterations=5
-        )
+        return {
+            "input": contextual_question,
+            "chat_history": chat_history
+        }
 
-        return agent_executor
+    async def _save_turn(self, owner_id: str, user_id: str, user_memory: ConversationBufferWindowMemory,
+                         question: str, answer: str):
+        user_memory.chat_memory.add_user_message(question)
+        user_memory.chat_memory.add_ai_message(answer)
 
-    async def process_question(self, question: str, owner_id: str, user_id: str) -> Dict[str, Any]:
-        try:
-            logger.info(
-                f"Processando pergunta: '{question}' para owner_id: {owner_id}, user_id: {user_id}")
+        if self.memory_manager.is_connected():
+            memory_key = f"{owner_id}:{user_id}"
+            with ASK_STAGE_SECONDS.labels("memory_save").time():
+                success = await self.memory_manager.append_user_turn(
+                    memory_key, user_memory,
+                    user_memory.chat_memory.messages[-2:])
+            if success:
+                logger.debug(
+                    "Memória salva no Redis para owner_id: %s, user_id: %s (%s mensagens)", owner_id, user_id, len(user_memory.chat_memory.messages))
+            else:
+                logger.warning(
+                    "Falha ao salvar memória no Redis para owner_id: %s, user_id: %s", owner_id, user_id)
+        else:
+            logger.warning(
+                "Redis não conectado, memória não será persistida")
+
+    def _collected_raw_data(self) -> List[Dict[str, Any]]:
+        return [carga.model_dump(mode="json") for carga in collected_cargas()]
+
+    async def _prepare_question(self, question: str, owner_id: str, user_id: str) -> Tuple[
+            ConversationBufferWindowMemory, Optional[Dict[str, Any]], Optional[str], Optional[Dict[str, Any]]]:
+        """Carrega a memória e tenta responder sem o agente (rota direta ou cache).
+
+        Retorna (memória, entrada do agente, chave do cache, resultado). Quando
+        o resultado vem preenchido o turno já foi salvo e o agente não precisa rodar.
+        Abre o turno das ferramentas, cujas cargas vão para o `raw_data`.
+        """
+        start_tool_turn()
+
+        with ASK_STAGE_SECONDS.labels("memory_load").time():
+            user_memory = await self._get_user_memory(owner_id, user_id)
+
+        routed = None
+        if settings.INTENT_ROUTER_ENABLED:
+            with ASK_STAGE_SECONDS.labels("intent_router").time():
+                routed = await answer_routed_question(question, owner_id)
+
+        if routed:
+            intent, tool, answer = routed
+            await self._save_turn(owner_id, user_id, user_memory,
+                                  question, answer)
+            raw_data = self._collected_raw_data()
+            return user_memory, None, None, {
+                "success": True,
+                "response": answer,
+                "data_count": len(raw_data),
+                "analysis": {
+                    "agent_used": False,
+                    "intent": intent,
+                    "tool_used": tool.name,
+                    "reasoning": "Pergunta direta respondida pela ferramenta sem passar pelo LLM"
+                },
+                "raw_data": raw_data
+            }
+
+        agent_input = self._build_agent_input(
+            owner_id, user_id, question, user_memory)
+
+        cache_key, cached = None, None
+        if self._answer_cache_available():
+            with ASK_STAGE_SECONDS.labels("answer_cache").time():
+                cache_key, cached = await self.answer_cache.lookup(
+                    question, owner_id, agent_input["chat_history"])
 
-            user_memory = self._get_user_memory(owner_id, user_id)
+        if cached:
+            logger.info(
+                "Resposta do cache para owner_id: %s, user_id: %s", owner_id, user_id)
+            await self._save_turn(owner_id, user_id, user_memory,
+                                  question, cached["response"])
+            return user_memory, agent_input, cache_key, {
+                "success": True,
+                "response": cached["response"],
+                "data_count": cached["data_count"],
+                "analysis": {
+                    "agent_used": False,
+                    "answer_cache": "hit",
+                    "reasoning": "Resposta reaproveitada do cache para a mesma pergunta e contexto"
+                },
+                "raw_data": cached["raw_data"]
+            }
 
-            user_memory.chat_memory.add_user_message(question)
+        return user_memory, agent_input, cache_key, None
 
-            contextual_question = f"Pergunta: {question}\n\nContexto: O owner_id é '{owner_id}'. Use este owner_id em todas as buscas no banco de dados."
+    async def _finish_question(self, owner_id: str, user_id: str, user_memory: ConversationBufferWindowMemory,
+                               question: str, agent_response: str, cache_key: Optional[str]) -> Dict[str, Any]:
+        await self._save_turn(owner_id, user_id, user_memory,
+                              question, agent_response)
 
-            agent_with_memory = self._create_agent_with_memory(
-                owner_id, user_id, user_memory)
+        raw_data = self._collected_raw_data()
+        data_count = len(raw_data)
 
-            result = await agent_with_memory.ainvoke({
-                "input": contextual_question
+        if cache_key:
+            await self.answer_cache.store(cache_key, {
+                "response": agent_response,
+                "data_count": data_count,
+                "raw_data": raw_data
             })
 
-            agent_response = result.get(
-                "output", "Não foi possível processar a pergunta.")
+        return {
+            "success": True,
+            "response": agent_response,
+            "data_count": data_count,
+            "analysis": {
+                "agent_used": True,
+                "tools_available": [tool.name for tool in TOOLS],
+                "reasoning": "Agente LangChain processou a pergunta usando ferramentas disponíveis"
+            },
+            "raw_data": raw_data
+        }
+
+    def _error_result(self, e: Exception) -> Dict[str, Any]:
+        return {
+            "success": False,
+            "response": f"Desculpe, ocorreu um erro ao processar sua pergunta: {str(e)}",
+            "data_count": 0,
+            "analysis": {
+                "agent_used": True,
+                "error": str(e),
+                "conversation_busy": isinstance(e, ConversationBusyError)
+            },
+            "raw_data": []
+        }
 
-            user_memory.chat_memory.add_ai_message(agent_response)
+    async def process_question(self, question: str, owner_id: str, user_id: str,
+                               idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        memory_key = f"{owner_id}:{user_id}"
+        with ASK_STAGE_SECONDS.labels("total").time():
+            result = await self.conversation_guard.single_flight(
+                memory_key, question,
+                lambda: self._process_question(question, owner_id, user_id, idempotency_key))
+        self.compactor.schedule(memory_key)
+        return result
+
+    async def _process_question(self, question: str, owner_id: str, user_id: str,
+                                idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        try:
+            logger.info(
+                "Processando pergunta para owner_id: %s, user_id: %s", owner_id, user_id)
+            logger.debug("Pergunta: %s", question)
 
-            if self.memory_manager.is_connected():
-                memory_key = f"{owner_id}:{user_id}"
-                success = self.memory_manager.save_user_memory(
-                    memory_key, user_memory)
-                if success:
+            memory_key = f"{owner_id}:{user_id}"
+            async with self.conversation_guard.lock(memory_key):
+                recent = await self.conversation_guard.get_recent_result(memory_key, idempotency_key)
+                if recent:
                     logger.info(
-                        f"Memória salva no Redis para owner_id: {owner_id}, user_id: {user_id} ({len(user_memory.chat_memory.messages)} mensagens)")
-                else:
-                    logger.warning(
-                        f"Falha ao salvar memória no Redis para owner_id: {owner_id}, user_id: {user_id}")
-            else:
-                logger.warning(
-                    "Redis não conectado, memória não será persistida")
+                        "Pergunta reenviada para owner_id: %s, user_id: %s, reaproveitando o último turno", owner_id, user_id)
+                    return recent
 
-            raw_data = []
-            data_count = 0
+                user_memory, agent_input, cache_key, result = await self._prepare_question(
+                    question, owner_id, user_id)
 
-            if "código:" in agent_response.lower() or "carga encontrada" in agent_response.lower():
-                data_count = 1
+                if not result:
+                    with ASK_STAGE_SECONDS.labels("agent").time():
+                        agent_result = await self.agent_executor.ainvoke(
+                            agent_input, config={"callbacks": self._run_callbacks()})
 
-            return {
-                "success": True,
-                "response": agent_response,
-                "data_count": data_count,
-                "analysis": {
-                    "agent_used": True,
-                    "tools_available": [tool.name for tool in TOOLS],
-                    "reasoning": "Agente LangChain processou a pergunta usando ferramentas disponíveis"
-                },
-                "raw_data": raw_data
-            }
+                    agent_response = agent_result.get(
+                        "output", "Não foi possível processar a pergunta.")
+
+                    result = await self._finish_question(
+                        owner_id, user_id, user_memory, question, agent_response, cache_key)
+
+                await self.conversation_guard.remember_result(memory_key, idempotency_key, result)
+                return result
 
         except Exception as e:
-            logger.error(f"Erro ao processar pergunta com agente: {e}")
-            return {
-                "success": False,
-                "response": f"Desculpe, ocorreu um erro ao processar sua pergunta: {str(e)}",
-                "data_count": 0,
-                "analysis": {
-                    "agent_used": True,
-                    "error": str(e)
-                },
-                "raw_data": []
-            }
+            logger.error("Erro ao processar pergunta com agente: %s", e)
+            return self._error_result(e)
+
+    async def stream_question(self, question: str, owner_id: str, user_id: str,
+                              idempotency_key: Optional[str] = None) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Processa a pergunta emitindo (evento, dados) conforme o agente avança.
+
+        Eventos: tool_start, tool_end, token (trecho da resposta final), done
+        (mesmo resultado de process_question) e error. A memória só é salva
+        quando o agente termina.
+        """
+        try:
+            logger.info(
+                "Processando pergunta (stream) para owner_id: %s, user_id: %s", owner_id, user_id)
+            logger.debug("Pergunta: %s", question)
 
-    def clear_user_memory(self, owner_id: str, user_id: str = None) -> bool:
+            memory_key = f"{owner_id}:{user_id}"
+            async with self.conversation_guard.lock(memory_key):
+                result = await self.conversation_guard.get_recent_result(memory_key, idempotency_key)
+
+                if not result:
+                    user_memory, agent_input, cache_key, result = await self._prepare_question(
+                        question, owner_id, user_id)
+
+                if result:
+                    await self.conversation_guard.remember_result(memory_key, idempotency_key, result)
+                    self.compactor.schedule(memory_key)
+                    yield "token", {"content": result["response"]}
+                    yield "done", result
+                    return
+
+                agent_response = None
+                async for event in self.streaming_agent_executor.astream_events(
+                        agent_input, config={"callbacks": self._run_callbacks()}, version="v1"):
+                    kind = event["event"]
+                    if kind == "on_tool_start":
+                        yield "tool_start", {"tool": event["name"], "input": event["data"].get("input")}
+                    elif kind == "on_tool_end":
+                        yield "tool_end", {"tool": event["name"], "output": event["data"].get("output")}
+                    elif kind == "on_chat_model_stream":
+                        content = event["data"]["chunk"].content
+                        if content:
+                            yield "token", {"content": content}
+                    elif kind == "on_chain_end" and event["name"] == "AgentExecutor":
+                        agent_response = (event["data"].get("output") or {}).get("output")
+
+                result = await self._finish_question(
+                    owner_id, user_id, user_memory, question,
+                    agent_response or "Não foi possível processar a pergunta.", cache_key)
+                await self.conversation_guard.remember_result(memory_key, idempotency_key, result)
+                self.compactor.schedule(memory_key)
+                yield "done", result
+
+        except Exception as e:
+            logger.error("Erro ao processar pergunta com agente (stream): %s", e)
+            yield "error", self._error_result(e)
+
+    async def clear_user_memory(self, owner_id: str, user_id: str = None) -> bool:
         try:
             if user_id:
                 memory_key = f"{owner_id}:{user_id}"
 
                 if self.memory_manager.is_connected():
-                    success = self.memory_manager.clear_user_memory(memory_key)
+                    success = await self.memory_manager.clear_user_memory(memory_key)
                     if success:
                         logger.info(
-                            f"Memória limpa no Redis para owner_id: {owner_id}, user_id: {user_id}")
+                            "Memória limpa no Redis para owner_id: %s, user_id: %s", owner_id, user_id)
                         return True
 
                 if memory_key in self.user_memories:
                     del self.user_memories[memory_key]
                     logger.info(
-                        f"Memória limpa em RAM para owner_id: {owner_id}, user_id: {user_id}")
+                        "Memória limpa em RAM para owner_id: %s, user_id: %s", owner_id, user_id)
                     return True
             else:
                 cleared_count = 0
 
                 if self.memory_manager.is_connected():
-                    pattern = f"agent_memory:{owner_id}:*"
-                    keys = self.memory_manager.redis_client.keys(pattern)
-                    for key in keys:
-                        if self.memory_manager.redis_client.delete(key):
-                            cleared_count += 1
+                    cleared_count += await self.memory_manager.clear_owner_memories(owner_id)
                     logger.info(
-                        f"Memórias limpas no Redis para owner_id: {owner_id} ({cleared_count} usuários)")
+                        "Memórias limpas no Redis para owner_id: %s (%s usuários)", owner_id, cleared_count)
 
                 memory_keys_to_remove = [
                     key for key in self.user_memories.keys() if key.startswith(f"{owner_id}:")]
@@ -217,21 +421,22 @@ Seja sempre útil e forneça informações completas e organizadas.
                     del self.user_memories[key]
                     cleared_count += 1
                 logger.info(
-                    f"Memórias limpas em RAM para owner_id: {owner_id} ({len(memory_keys_to_remove)} usuários)")
+                    "Memórias limpas em RAM para owner_id: %s (%s usuários)", owner_id, len(memory_keys_to_remove))
 
                 return cleared_count > 0
 
             return False
         except Exception as e:
-            logger.error(f"Erro ao limpar memória: {e}")
+            logger.error("Erro ao limpar memória: %s", e)
             return False
 
-    def get_user_memory_info(self, owner_id: str, user_id: str = None) -> Dict[str, Any]:
+    async def get_user_memory_info(self, owner_id: str, user_id: str = None,
+                                   cursor: int = 0, limit: int = 50) -> Dict[str, Any]:
         if user_id:
             memory_key = f"{owner_id}:{user_id}"
 
             if self.memory_manager.is_connected():
-                return self.memory_manager.get_user_memory_info(memory_key)
+                return await self.memory_manager.get_user_memory_info(memory_key)
 
             if memory_key not in self.user_memories:
                 return {
@@ -263,50 +468,48 @@ Seja sempre útil e forneça informações completas e organizadas.
             users_info = []
 
             if self.memory_manager.is_connected():
-                pattern = f"agent_memory:{owner_id}:*"
-                keys = self.memory_manager.redis_client.keys(pattern)
-                for key in keys:
-                    user_id_from_key = key.replace(
-                        f"agent_memory:{owner_id}:", "")
-                    user_info = self.memory_manager.get_user_memory_info(key)
-                    user_info["owner_id"] = owner_id
-                    user_info["user_id"] = user_id_from_key
-                    users_info.append(user_info)
+                next_cursor, users_info = await self.memory_manager.get_owner_memories_info(
+                    owner_id, cursor, limit)
             else:
-                for memory_key in self.user_memories.keys():
-                    if memory_key.startswith(f"{owner_id}:"):
-                        user_id_from_key = memory_key.replace(
-                            f"{owner_id}:", "")
-                        memory = self.user_memories[memory_key]
-                        user_info = {
-                            "has_memory": True,
-                            "message_count": len(memory.chat_memory.messages),
-                            "memory_window": self.memory_window,
-                            "storage": "ram",
-                            "owner_id": owner_id,
-                            "user_id": user_id_from_key
-                        }
-                        users_info.append(user_info)
+                owner_keys = [key for key in self.user_memories.keys()
+                              if key.startswith(f"{owner_id}:")]
+                for memory_key in owner_keys[cursor:cursor + limit]:
+                    user_id_from_key = memory_key.replace(
+                        f"{owner_id}:", "")
+                    memory = self.user_memories[memory_key]
+                    user_info = {
+                        "has_memory": True,
+                        "message_count": len(memory.chat_memory.messages),
+                        "memory_window": self.memory_window,
+                        "storage": "ram",
+                        "owner_id": owner_id,
+                        "user_id": user_id_from_key
+                    }
+                    users_info.append(user_info)
+                next_cursor = cursor + limit if cursor + limit < len(owner_keys) else 0
 
             return {
                 "owner_id": owner_id,
                 "total_users": len(users_info),
-                "users": users_info
+                "users": users_info,
+                "next_cursor": next_cursor
             }
 
-    def get_all_memories_info(self) -> Dict[str, Any]:
+    async def get_all_memories_info(self, cursor: int = 0, limit: int = 50) -> Dict[str, Any]:
         if self.memory_manager.is_connected():
-            return self.memory_manager.get_all_memories_info()
+            return await self.memory_manager.get_all_memories_info(cursor, limit)
 
+        memory_keys = list(self.user_memories.keys())
         return {
-            "total_users": len(self.user_memories),
-            "users": list(self.user_memories.keys()),
+            "total_users": len(memory_keys[cursor:cursor + limit]),
+            "users": memory_keys[cursor:cursor + limit],
+            "next_cursor": cursor + limit if cursor + limit < len(memory_keys) else 0,
             "memory_window": self.memory_window,
             "storage": "ram"
         }
 
-    def get_redis_info(self) -> Dict[str, Any]:
-        return self.memory_manager.get_redis_info()
+    async def get_redis_info(self) -> Dict[str, Any]:
+        return await self.memory_manager.get_redis_info()
 
 
 ai_agent = CargaAIAgent()
@@ -0,0 +1,146 @@
+import hashlib
+import json
+import re
+import unicodedata
+import redis.asyncio as aioredis
+import logging
+from typing import Dict, List, Any, Optional, Tuple
+from langchain_core.messages import BaseMessage
+from src.config import settings
+from src.metrics import REDIS_OPERATION_SECONDS, timed
+import os
+
+logger = logging.getLogger(__name__)
+
+ANSWER_CACHE_PREFIX = "answer_cache"
+OWNER_VERSION_PREFIX = "cargas_version"
+ALL_OWNERS_VERSION = "*"
+STATELESS_FINGERPRINT = "stateless"
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """Normaliza a pergunta para a chave do cache: caixa, acentos, espaços e pontuação final."""
+    text = unicodedata.normalize("NFKD", question.casefold())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return WHITESPACE_PATTERN.sub(" ", text).strip().rstrip("?!. ")
+
+
+def memory_fingerprint(messages: List[BaseMessage]) -> str:
+    if not messages:
+        return STATELESS_FINGERPRINT
+
+    data = json.dumps([[msg.type, msg.content] for msg in messages],
+                      ensure_ascii=False)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+class AnswerCache:
+    """Cache de respostas do /ask no Redis.
+
+    A chave inclui o carimbo de versão das cargas do owner, incrementado a cada
+    NOTIFY de mudança no banco; respostas de versões antigas deixam de ser
+    encontradas e expiram pelo TTL.
+    """
+
+    def __init__(self, redis_url: str = None, ttl_seconds: int = None):
+        self.redis_url = redis_url or os.getenv(
+            "REDIS_URL", "redis://localhost:6379")
+        self.ttl_seconds = ttl_seconds or settings.ANSWER_CACHE_TTL_SECONDS
+        self.redis_client = None
+        self.pool: Optional[aioredis.ConnectionPool] = None
+        self.hits = 0
+        self.misses = 0
+
+    async def connect(self):
+        try:
+            self.pool = aioredis.ConnectionPool.from_url(
+                self.redis_url,
+                decode_responses=True,
+                max_connections=settings.REDIS_MAX_CONNECTIONS,
+                socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+                socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+                health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL
+            )
+            client = aioredis.Redis(connection_pool=self.pool)
+            await client.ping()
+            self.redis_client = client
+            logger.info("Cache de respostas conectado ao Redis")
+        except Exception as e:
+            logger.error("Erro ao conectar cache de respostas ao Redis: %s", e)
+            if self.pool:
+                await self.pool.disconnect()
+            self.pool = None
+            self.redis_client = None
+
+    async def disconnect(self):
+        if self.redis_client:
+            await self.redis_client.aclose()
+            self.redis_client = None
+        if self.pool:
+            await self.pool.disconnect()
+            self.pool = None
+
+    def is_connected(self) -> bool:
+        return self.redis_client is not None
+
+    def _version_key(self, owner_id: str) -> str:
+        return f"{OWNER_VERSION_PREFIX}:{owner_id}"
+
+    async def _version(self, owner_id: str) -> str:
+        owner_version, all_version = await self.redis_client.mget(
+            self._version_key(owner_id), self._version_key(ALL_OWNERS_VERSION))
+        return f"{all_version or 0}.{owner_version or 0}"
+
+    @timed(REDIS_OPERATION_SECONDS, "answer_cache_lookup")
+    async def lookup(self, question: str, owner_id: str,
+                     chat_history: List[BaseMessage]) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """Retorna (chave, resposta em cache). A chave é usada depois em `store`.
+
+        Em caso de erro no Redis retorna (None, None) e a pergunta segue sem cache.
+        """
+        try:
+            version = await self._version(owner_id)
+            digest = hashlib.sha256(
+                f"{normalize_question(question)}\n{memory_fingerprint(chat_history)}".encode()).hexdigest()
+            key = f"{ANSWER_CACHE_PREFIX}:{owner_id}:{version}:{digest}"
+
+            data = await self.redis_client.get(key)
+            if data is None:
+                self.misses += 1
+                return key, None
+
+            self.hits += 1
+            return key, json.loads(data)
+        except Exception as e:
+            logger.error("Erro ao consultar cache de respostas: %s", e)
+            return None, None
+
+    @timed(REDIS_OPERATION_SECONDS, "answer_cache_store")
+    async def store(self, key: str, result: Dict[str, Any]) -> bool:
+        try:
+            await self.redis_client.set(
+                key, json.dumps(result, ensure_ascii=False, default=str), ex=self.ttl_seconds)
+            return True
+        except Exception as e:
+            logger.error("Erro ao salvar no cache de respostas: %s", e)
+            return False
+
+    async def bump_owner_version(self, owner_id: str):
+        """Invalida as respostas do owner ("*" invalida todos os owners)."""
+        try:
+            await self.redis_client.incr(self._version_key(owner_id))
+        except Exception as e:
+            logger.error(
+                "Erro ao invalidar cache de respostas do owner %s: %s", owner_id, e)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "connected": self.is_connected(),
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,89 @@
+import asyncio
+import logging
+from typing import List, Optional, Set
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from src.config import settings
+from src.metrics import metrics_handler
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_SYSTEM_PROMPT = """Você resume conversas entre um usuário e um assistente de cargas e logística.
+Escreva em português um resumo objetivo de no máximo {max_words} palavras, mantendo
+códigos de cargas, chaves de documentos, status, cidades e conclusões que possam
+ser citados depois. Se houver um resumo anterior, incorpore-o ao novo."""
+
+
+class ConversationCompactor:
+    """Resume em segundo plano as mensagens que já saíram da janela de memória.
+
+    Roda depois da resposta ao usuário: quando a lista da conversa passa de
+    MEMORY_SUMMARY_THRESHOLD mensagens, as mais antigas que a janela viram um
+    resumo no Redis, que o memory manager coloca antes da janela.
+    """
+
+    def __init__(self, memory_manager, llm: BaseChatModel):
+        self.memory_manager = memory_manager
+        self.llm = llm
+        self._running: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def schedule(self, memory_key: str):
+        if (not self.memory_manager.uses_summary
+                or not self.memory_manager.is_connected()
+                or memory_key in self._running):
+            return
+
+        self._running.add(memory_key)
+        task = asyncio.create_task(self.compact(memory_key))
+        self._tasks.add(task)
+
+        def _done(_):
+            self._tasks.discard(task)
+            self._running.discard(memory_key)
+
+        task.add_done_callback(_done)
+
+    async def close(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def compact(self, memory_key: str) -> bool:
+        try:
+            summary, entries = await self.memory_manager.get_compaction_batch(memory_key)
+            if not entries:
+                return False
+
+            messages = self.memory_manager.messages_from_entries(entries)
+            new_summary = await self._summarize(summary, messages)
+
+            saved = await self.memory_manager.save_compaction(
+                memory_key, new_summary, entries)
+            if saved:
+                logger.info(
+                    "Conversa %s compactada: %s mensagens resumidas", memory_key, len(entries))
+            else:
+                logger.info(
+                    "Compactação de %s descartada, a memória mudou durante o resumo", memory_key)
+            return saved
+
+        except Exception as e:
+            logger.error("Erro ao compactar conversa %s: %s", memory_key, e)
+            return False
+
+    async def _summarize(self, summary: Optional[str], messages: List[BaseMessage]) -> str:
+        lines = []
+        if summary:
+            lines.append(f"Resumo anterior:\n{summary}\n")
+        lines.append("Conversa:")
+        for msg in messages:
+            speaker = "Usuário" if msg.type == "human" else "Assistente"
+            lines.append(f"{speaker}: {msg.content}")
+
+        response = await self.llm.ainvoke([
+            SystemMessage(content=SUMMARY_SYSTEM_PROMPT.format(
+                max_words=settings.MEMORY_SUMMARY_MAX_WORDS)),
+            HumanMessage(content="\n".join(lines))
+        ], config={"callbacks": [metrics_handler]})
+        return response.content.strip()
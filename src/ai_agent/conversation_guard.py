@@ -0,0 +1,142 @@
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional, Tuple, Callable, Awaitable
+from redis.exceptions import LockError
+from src.ai_agent.answer_cache import normalize_question
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+LOCK_PREFIX = "agent_lock"
+RECENT_TURN_PREFIX = "agent_recent_turn"
+
+
+class ConversationBusyError(Exception):
+    pass
+
+
+class ConversationGuard:
+    """Ordena os turnos de cada conversa (owner_id:user_id) e evita execuções duplicadas.
+
+    - lock local (asyncio.Lock) + lock no Redis, para valer entre workers;
+    - single-flight: a mesma pergunta em andamento na conversa reaproveita a execução;
+    - com o idempotency_key do cliente, o resultado fica alguns segundos no
+      Redis, para que um reenvio que caia em outro worker não rode o agente de
+      novo. Sem a chave, uma pergunta repetida depois de respondida roda outra
+      vez (pode ser uma nova consulta de um status que mudou).
+    """
+
+    def __init__(self, memory_manager):
+        self.memory_manager = memory_manager
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._lock_users: Dict[str, int] = {}
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+
+    @asynccontextmanager
+    async def lock(self, memory_key: str):
+        local_lock = self._locks.setdefault(memory_key, asyncio.Lock())
+        self._lock_users[memory_key] = self._lock_users.get(memory_key, 0) + 1
+        try:
+            async with local_lock:
+                redis_lock = await self._acquire_redis_lock(memory_key)
+                try:
+                    yield
+                finally:
+                    if redis_lock is not None:
+                        await self._release_redis_lock(redis_lock)
+        finally:
+            self._lock_users[memory_key] -= 1
+            if not self._lock_users[memory_key]:
+                del self._lock_users[memory_key]
+                del self._locks[memory_key]
+
+    async def _acquire_redis_lock(self, memory_key: str):
+        if not self.memory_manager.is_connected():
+            return None
+
+        # thread_local=False: no cliente síncrono o acquire e o release rodam
+        # em threads diferentes do asyncio.to_thread.
+        redis_lock = self.memory_manager.redis_client.lock(
+            f"{LOCK_PREFIX}:{memory_key}",
+            timeout=settings.CONVERSATION_LOCK_TIMEOUT,
+            blocking_timeout=settings.CONVERSATION_LOCK_WAIT,
+            thread_local=False
+        )
+        try:
+            acquired = await self.memory_manager.call(redis_lock.acquire)
+        except Exception as e:
+            logger.error(
+                "Erro ao obter lock da conversa %s no Redis, seguindo só com o lock local: %s", memory_key, e)
+            return None
+
+        if not acquired:
+            raise ConversationBusyError(
+                f"Conversa {memory_key} ocupada com outra pergunta, tente novamente")
+        return redis_lock
+
+    async def _release_redis_lock(self, redis_lock):
+        try:
+            await self.memory_manager.call(redis_lock.release)
+        except LockError:
+            logger.warning(
+                "Lock %s expirou antes do fim do turno", redis_lock.name)
+        except Exception as e:
+            logger.error("Erro ao liberar lock %s: %s", redis_lock.name, e)
+
+    def _recent_turn_key(self, memory_key: str, idempotency_key: str) -> str:
+        return f"{RECENT_TURN_PREFIX}:{memory_key}:{idempotency_key}"
+
+    def _uses_recent_turns(self, idempotency_key: Optional[str]) -> bool:
+        return bool(idempotency_key
+                    and settings.DUPLICATE_TURN_WINDOW_SECONDS
+                    and self.memory_manager.is_connected())
+
+    async def get_recent_result(self, memory_key: str, idempotency_key: Optional[str]) -> Optional[Dict[str, Any]]:
+        if not self._uses_recent_turns(idempotency_key):
+            return None
+
+        try:
+            data = await self.memory_manager.call(
+                self.memory_manager.redis_client.get, self._recent_turn_key(memory_key, idempotency_key))
+        except Exception as e:
+            logger.error("Erro ao ler último turno de %s: %s", memory_key, e)
+            return None
+
+        if not data:
+            return None
+        return json.loads(data)
+
+    async def remember_result(self, memory_key: str, idempotency_key: Optional[str], result: Dict[str, Any]):
+        if not self._uses_recent_turns(idempotency_key):
+            return
+
+        data = json.dumps(result, ensure_ascii=False, default=str)
+        try:
+            await self.memory_manager.call(
+                self.memory_manager.redis_client.set, self._recent_turn_key(memory_key, idempotency_key), data,
+                ex=settings.DUPLICATE_TURN_WINDOW_SECONDS)
+        except Exception as e:
+            logger.error("Erro ao salvar último turno de %s: %s", memory_key, e)
+
+    async def single_flight(self, memory_key: str, question: str,
+                            run: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Executa `run` uma vez por (conversa, pergunta normalizada) em andamento.
+
+        Quem chega com a mesma pergunta enquanto ela roda recebe o mesmo
+        resultado. A execução continua mesmo se quem a iniciou for cancelado.
+        """
+        flight_key = (memory_key, normalize_question(question))
+
+        task = self._inflight.get(flight_key)
+        if task is not None:
+            logger.info(
+                "Pergunta repetida em andamento para %s, aguardando a mesma execução", memory_key)
+        else:
+            task = asyncio.ensure_future(run())
+            self._inflight[flight_key] = task
+            task.add_done_callback(
+                lambda _: self._inflight.pop(flight_key, None))
+
+        return await asyncio.shield(task)
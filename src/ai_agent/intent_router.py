@@ -0,0 +1,135 @@
+import re
+import logging
+from typing import Dict, Any, Optional, Tuple
+from langchain_core.tools import BaseTool
+from src.ai_agent.tools import (
+    search_carga_by_identifier,
+    search_cargas_by_status,
+    count_cargas_by_status,
+    get_carga_details,
+    collected_cargas,
+)
+from src.ai_agent.tool_format import output_format
+from src.db.database import CHAVE_DOCUMENTO_PATTERN, CHAVE_SEPARATORS_PATTERN
+from src.metrics import metrics_handler
+
+logger = logging.getLogger(__name__)
+
+# Código de carga/pedido: ao menos 4 caracteres, com letras e dígitos (OFR001),
+# hifenizado com dígito (ofr-001) ou hifenizado em maiúsculas (D-ABCD). Números
+# soltos ("1", "2024") e palavras com hífen ("em-transito") ficam com o agente,
+# para não caírem na busca por substring.
+IDENTIFIER = (
+    r"(?P<identifier>(?=[\w-]{4,}\b)(?:"
+    r"(?=[A-Za-z0-9]*[A-Za-z])(?=[A-Za-z0-9]*\d)[A-Za-z0-9]+"
+    r"|(?=[\w-]*\d)[A-Za-z0-9]+(?:-[A-Za-z0-9]+)+"
+    r"|(?-i:[A-Z0-9]+(?:-[A-Z0-9]+)+)"
+    r"))"
+)
+# Chave de NF-e/CT-e colada com ou sem separadores; validada depois com 44 dígitos.
+CHAVE = r"(?P<chave>\d(?:[\s.\-/]?\d){43})"
+
+STATUS_WORDS = [
+    (re.compile(r"^dispon[ií]ve(?:l|is)$", re.IGNORECASE), "disponivel"),
+    (re.compile(r"^em[ _]tr[aâ]nsito$", re.IGNORECASE), "em_transito"),
+    (re.compile(r"^entregues?$", re.IGNORECASE), "entregue"),
+]
+STATUS = r"(?P<status>dispon[ií]ve(?:l|is)|em[ _]tr[aâ]nsito|entregues?)"
+
+CARGAS = r"(?:as\s+)?cargas?"
+COM_STATUS = r"(?:(?:est[aã]o|que\s+est[aã]o|com\s+status)\s+)?"
+
+# Só perguntas que casam por inteiro com um destes padrões são roteadas;
+# qualquer outra coisa (follow-ups, comparações, filtros combinados) vai ao agente.
+INTENT_PATTERNS = [
+    ("chave", search_carga_by_identifier, re.compile(
+        rf"^(?:(?:chave|nf-?e|ct-?e)\s*:?\s*)?{CHAVE}$", re.IGNORECASE)),
+    ("status_da_carga", search_carga_by_identifier, re.compile(
+        rf"^(?:qual\s+(?:[eé]\s+)?o\s+)?status\s+d[ao]\s+(?:carga\s+)?{IDENTIFIER}$", re.IGNORECASE)),
+    ("detalhes_da_carga", get_carga_details, re.compile(
+        rf"^(?:mostre\s+(?:os\s+)?)?(?:detalhes|dados|informa[cç](?:[aã]o|[oõ]es))\s+d[ao]\s+carga\s+{IDENTIFIER}$", re.IGNORECASE)),
+    ("carga", search_carga_by_identifier, re.compile(
+        rf"^(?:(?:buscar?|procurar?|consultar?)\s+)?(?:a\s+)?(?:carga\s+)?{IDENTIFIER}$", re.IGNORECASE)),
+    ("contagem_por_status", count_cargas_by_status, re.compile(
+        rf"^quantas\s+cargas\s+{COM_STATUS}{STATUS}$", re.IGNORECASE)),
+    ("cargas_por_status", search_cargas_by_status, re.compile(
+        rf"^(?:(?:mostre|mostrar|liste|listar|quais)\s+)?{CARGAS}\s+{COM_STATUS}{STATUS}$", re.IGNORECASE)),
+]
+
+IDENTIFIER_INTENTS = {"chave", "status_da_carga", "detalhes_da_carga", "carga"}
+
+TRAILING_PUNCTUATION = "?!. "
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def _canonical_status(word: str) -> str:
+    for pattern, status in STATUS_WORDS:
+        if pattern.match(word):
+            return status
+    return word
+
+
+def route_question(question: str, owner_id: str) -> Optional[Tuple[str, BaseTool, Dict[str, Any]]]:
+    """Identifica perguntas diretas que dispensam o LLM.
+
+    Retorna (intenção, ferramenta, argumentos) ou None quando a pergunta
+    deve seguir para o agente.
+    """
+    text = WHITESPACE_PATTERN.sub(" ", question).strip().rstrip(TRAILING_PUNCTUATION)
+
+    for intent, tool, pattern in INTENT_PATTERNS:
+        match = pattern.match(text)
+        if not match:
+            continue
+
+        groups = match.groupdict()
+        if "chave" in groups:
+            chave = CHAVE_SEPARATORS_PATTERN.sub("", groups["chave"])
+            if not CHAVE_DOCUMENTO_PATTERN.match(chave):
+                return None
+            return intent, tool, {"identifiers": [chave], "owner_id": owner_id}
+
+        if "status" in groups:
+            return intent, tool, {"status": _canonical_status(groups["status"]), "owner_id": owner_id}
+
+        if tool is get_carga_details:
+            return intent, tool, {"codigos": [groups["identifier"]], "owner_id": owner_id}
+
+        return intent, tool, {"identifiers": [groups["identifier"]], "owner_id": owner_id}
+
+    return None
+
+
+async def answer_routed_question(question: str, owner_id: str) -> Optional[Tuple[str, BaseTool, str]]:
+    """Executa a ferramenta da pergunta roteada e devolve (intenção, ferramenta, resposta).
+
+    Retorna None se a pergunta não foi roteada, se a ferramenta falhou ou se a
+    busca por identificador não achou exatamente uma carga, para que o agente
+    tente responder. As cargas são contadas pelo coletor do turno
+    (start_tool_turn); fora de um turno toda busca por identificador vai ao agente.
+    """
+    routed = route_question(question, owner_id)
+    if not routed:
+        return None
+
+    intent, tool, args = routed
+    collected_before = len(collected_cargas())
+    # A saída vai direto ao usuário, então usa o formato descritivo.
+    with output_format("text"):
+        answer = await tool.ainvoke(args, config={"callbacks": [metrics_handler]})
+
+    if answer.startswith("Erro"):
+        logger.warning(
+            "Ferramenta %s falhou na rota direta '%s', usando o agente", tool.name, intent)
+        return None
+
+    # Busca por identificador só responde direto quando acha exatamente uma
+    # carga; nenhuma ou várias ficam para o agente interpretar.
+    if (intent in IDENTIFIER_INTENTS
+            and len(collected_cargas()) - collected_before != 1):
+        logger.info(
+            "Rota direta '%s' não encontrou uma única carga, usando o agente", intent)
+        return None
+
+    logger.info("Pergunta roteada sem LLM: intenção '%s' → %s", intent, tool.name)
+    return intent, tool, answer.strip()
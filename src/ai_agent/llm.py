@@ -0,0 +1,145 @@
+import asyncio
+import json
+import os
+import re
+import time
+from typing import Dict, List, Any, Optional, AsyncIterator
+from langchain_openai import ChatOpenAI
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from src.ai_agent.intent_router import IDENTIFIER, route_question
+from src.ai_agent.tools import search_carga_by_identifier
+from src.config import settings
+
+AGENT_INPUT_PATTERN = re.compile(
+    r"Pergunta: (?P<question>.*?)\n\nContexto: O owner_id é '(?P<owner_id>[^']*)'", re.DOTALL)
+IDENTIFIER_PATTERN = re.compile(rf"\b{IDENTIFIER}\b")
+FAKE_FALLBACK_ANSWER = (
+    "Não consegui identificar uma carga, documento ou status na pergunta. "
+    "Informe o código da carga, a chave do documento ou o status desejado.")
+
+
+class FakeChatModel(BaseChatModel):
+    """LLM local e determinístico para testes de carga sem a OpenAI (LLM_PROVIDER=fake).
+
+    Decide as chamadas de ferramenta pelos padrões do intent router; fora deles,
+    chama search_carga_by_identifier para cada código citado na pergunta.
+    Depois das ferramentas, responde com as saídas delas. Cada chamada espera
+    `latency_seconds` antes de responder.
+    """
+
+    latency_seconds: float = 0.0
+    streaming: bool = False
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-cargas"
+
+    def _tool_calls(self, question: str, owner_id: str) -> List[Dict[str, Any]]:
+        routed = route_question(question, owner_id)
+        if routed:
+            _, tool, args = routed
+            calls = [(tool.name, args)]
+        else:
+            identifiers = dict.fromkeys(
+                match.group("identifier") for match in IDENTIFIER_PATTERN.finditer(question))
+            calls = [(search_carga_by_identifier.name, {"identifiers": [identifier], "owner_id": owner_id})
+                     for identifier in identifiers]
+
+        return [{
+            "id": f"call_{index}",
+            "type": "function",
+            "function": {"name": name, "arguments": json.dumps(args, ensure_ascii=False)}
+        } for index, (name, args) in enumerate(calls)]
+
+    def _reply(self, messages: List[BaseMessage]) -> AIMessage:
+        tool_outputs = []
+        for msg in reversed(messages):
+            if not isinstance(msg, ToolMessage):
+                break
+            tool_outputs.insert(0, msg.content)
+        if tool_outputs:
+            return AIMessage(content="\n\n".join(tool_outputs))
+
+        match = AGENT_INPUT_PATTERN.search(messages[-1].content)
+        if match:
+            question, owner_id = match.group("question"), match.group("owner_id")
+        else:
+            question, owner_id = messages[-1].content, ""
+
+        tool_calls = self._tool_calls(question.strip(), owner_id)
+        if tool_calls:
+            return AIMessage(content="", additional_kwargs={"tool_calls": tool_calls})
+        return AIMessage(content=FAKE_FALLBACK_ANSWER)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(self.latency_seconds)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if not self.streaming:
+            await asyncio.sleep(self.latency_seconds)
+            return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+        message = None
+        async for chunk in self._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+            message = chunk.message if message is None else message + chunk.message
+        return ChatResult(generations=[ChatGeneration(
+            message=AIMessage(content=message.content, additional_kwargs=message.additional_kwargs))])
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency_seconds)
+        reply = self._reply(messages)
+
+        if reply.additional_kwargs:
+            tool_calls = [dict(call, index=index) for index, call
+                          in enumerate(reply.additional_kwargs["tool_calls"])]
+            chunks = [AIMessageChunk(content="", additional_kwargs={"tool_calls": tool_calls})]
+        else:
+            chunks = [AIMessageChunk(content=token)
+                      for token in re.findall(r"\S+\s*", reply.content)]
+
+        for message_chunk in chunks:
+            chunk = ChatGenerationChunk(message=message_chunk)
+            yield chunk
+            if run_manager:
+                await run_manager.on_llm_new_token(token=chunk.text, chunk=chunk)
+
+
+def create_llm(streaming: bool = False) -> BaseChatModel:
+    """LLM do agente conforme LLM_PROVIDER ("openai" ou "fake")."""
+    if settings.LLM_PROVIDER == "fake":
+        return FakeChatModel(
+            latency_seconds=settings.FAKE_LLM_LATENCY_SECONDS,
+            streaming=streaming
+        )
+
+    if settings.LLM_PROVIDER == "openai":
+        return ChatOpenAI(
+            model=settings.LLM_MODEL,
+            temperature=settings.LLM_TEMPERATURE,
+            streaming=streaming,
+            api_key=os.getenv("OPENAI_API_KEY")
+        )
+
+    raise Exception(f"LLM_PROVIDER inválido: {settings.LLM_PROVIDER}")
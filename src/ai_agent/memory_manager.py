@@ -1,247 +1,798 @@
+import asyncio
 import json
 import redis
+import redis.asyncio as aioredis
 import logging
-from typing import Dict, List, Any, Optional
+from contextlib import asynccontextmanager
+from typing import Dict, List, Any, Optional, Tuple, Callable, AsyncIterator
 from langchain.memory import ConversationBufferWindowMemory
-from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage
 from dotenv import load_dotenv
+from src.ai_agent.token_budget import TokenBudgetWindowMemory, message_tokens
+from src.config import settings
+from src.metrics import REDIS_OPERATION_SECONDS, timed
 import os
 
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+MEMORY_TTL_SECONDS = 7 * 24 * 60 * 60
+UNLINK_BATCH_SIZE = 500
+COMPACTION_RETRIES = 3
+SUMMARY_PREFIX = "Resumo da conversa anterior:\n"
+MEMORY_KEY_PREFIX = "agent_memory:"
 
-class RedisMemoryManager:
 
-    def __init__(self, redis_url: str = None, memory_window: int = 10):
+class BaseMemoryManager:
+    is_async = False
+
+    def __init__(self, redis_url: str = None, memory_window: int = 10,
+                 storage: str = None, max_messages: int = None, token_budget: int = None):
         self.redis_url = redis_url or os.getenv(
             "REDIS_URL", "redis://localhost:6379")
         self.memory_window = memory_window
+        self.token_budget = settings.MEMORY_TOKEN_BUDGET if token_budget is None else token_budget
+        self.storage = storage or settings.REDIS_MEMORY_STORAGE
+        self.max_messages = max(
+            max_messages or settings.REDIS_MEMORY_MAX_MESSAGES, memory_window * 2)
         self.redis_client = None
-        self._connect()
 
-    def _connect(self):
-        try:
-            self.redis_client = redis.from_url(
-                self.redis_url, decode_responses=True)
-            self.redis_client.ping()
-            logger.info("Conectado ao Redis com sucesso")
-        except Exception as e:
-            logger.error(f"Erro ao conectar ao Redis: {e}")
-            self.redis_client = None
+    @property
+    def uses_list_storage(self) -> bool:
+        return self.storage == "list"
 
     def _get_memory_key(self, memory_key: str) -> str:
-        return f"agent_memory:{memory_key}"
+        return f"{MEMORY_KEY_PREFIX}{memory_key}"
+
+    def _memory_key_from_redis_key(self, redis_key: str) -> str:
+        return redis_key[len(MEMORY_KEY_PREFIX):]
+
+    def _owner_memory_prefix(self, owner_id: str) -> str:
+        return self._get_memory_key(f"{owner_id}:")
+
+    def _user_ids_from_keys(self, owner_id: str, keys: List[str]) -> List[str]:
+        prefix = self._owner_memory_prefix(owner_id)
+        return [key[len(prefix):] for key in keys]
+
+    def _get_owner_index_key(self, owner_id: str) -> str:
+        return f"agent_memory_index:{owner_id}"
+
+    def _get_owner_index_ready_key(self, owner_id: str) -> str:
+        return f"agent_memory_index_ready:{owner_id}"
+
+    def _get_summary_key(self, memory_key: str) -> str:
+        return f"agent_memory_summary:{memory_key}"
+
+    @property
+    def uses_summary(self) -> bool:
+        return settings.MEMORY_SUMMARY_ENABLED and self.uses_list_storage
+
+    def _split_memory_key(self, memory_key: str) -> Tuple[str, str]:
+        owner_id, _, user_id = memory_key.partition(":")
+        return owner_id, user_id
+
+    def _queue_index_update(self, pipe, memory_key: str):
+        owner_id, user_id = self._split_memory_key(memory_key)
+        index_key = self._get_owner_index_key(owner_id)
+        pipe.sadd(index_key, user_id)
+        pipe.expire(index_key, MEMORY_TTL_SECONDS)
+        pipe.expire(self._get_owner_index_ready_key(owner_id), MEMORY_TTL_SECONDS)
+
+    def _queue_owner_index_backfill(self, pipe, owner_id: str, user_ids: List[str]):
+        """Grava no índice os usuários achados pelo SCAN e marca o índice como completo."""
+        index_key = self._get_owner_index_key(owner_id)
+        if user_ids:
+            pipe.sadd(index_key, *user_ids)
+            pipe.expire(index_key, MEMORY_TTL_SECONDS)
+        pipe.set(self._get_owner_index_ready_key(owner_id), 1, ex=MEMORY_TTL_SECONDS)
+
+    def _queue_owner_index_ready(self, pipe, owner_ids: List[str]):
+        for owner_id in owner_ids:
+            pipe.set(self._get_owner_index_ready_key(owner_id), 1, ex=MEMORY_TTL_SECONDS)
+
+    # Os _queue_* montam os comandos no pipeline (sync ou async); a execução
+    # e o tratamento de erros do Redis ficam nas subclasses.
+
+    def _queue_list_write(self, pipe, memory_key: str, entries: List[str],
+                          ttl: int = MEMORY_TTL_SECONDS):
+        redis_key = self._get_memory_key(memory_key)
+        pipe.rpush(redis_key, *entries)
+        pipe.ltrim(redis_key, -self.max_messages, -1)
+        pipe.expire(redis_key, ttl)
+        self._queue_index_update(pipe, memory_key)
+
+    def _queue_legacy_migration(self, pipe, redis_key: str, data: Optional[str], ttl: int):
+        """Troca o JSON legado (string) pela lista, mantendo o TTL que a chave tinha."""
+        messages = self._deserialize_messages(data)
+        pipe.delete(redis_key)
+        if messages:
+            self._queue_list_write(
+                pipe, self._memory_key_from_redis_key(redis_key),
+                self._serialize_entries(messages), ttl if ttl > 0 else MEMORY_TTL_SECONDS)
+
+    def _queue_save(self, pipe, memory_key: str, messages: List[BaseMessage]):
+        redis_key = self._get_memory_key(memory_key)
+        if not self.uses_list_storage:
+            pipe.setex(redis_key, MEMORY_TTL_SECONDS, self._serialize_messages(messages))
+            self._queue_index_update(pipe, memory_key)
+            return
+
+        pipe.delete(redis_key)
+        if messages:
+            self._queue_list_write(pipe, memory_key, self._serialize_entries(messages))
+
+    def _queue_append(self, pipe, memory_key: str, entries: List[str]):
+        self._queue_list_write(pipe, memory_key, entries)
+        if self.uses_summary:
+            pipe.expire(self._get_summary_key(memory_key), MEMORY_TTL_SECONDS)
+
+    def _queue_compaction_state(self, pipe, memory_key: str):
+        pipe.llen(self._get_memory_key(memory_key))
+        pipe.get(self._get_summary_key(memory_key))
+
+    def _queue_compaction_save(self, pipe, memory_key: str, summary: str, entry_count: int):
+        pipe.ltrim(self._get_memory_key(memory_key), entry_count, -1)
+        pipe.set(self._get_summary_key(memory_key), self._summary_to_data(summary),
+                 ex=MEMORY_TTL_SECONDS)
+
+    def _queue_clear_user(self, pipe, memory_key: str):
+        owner_id, user_id = self._split_memory_key(memory_key)
+        pipe.delete(self._get_memory_key(memory_key), self._get_summary_key(memory_key))
+        pipe.srem(self._get_owner_index_key(owner_id), user_id)
+
+    def _queue_clear_owner(self, pipe, owner_id: str, user_ids: List[str]):
+        memory_keys = list(dict.fromkeys(f"{owner_id}:{user_id}" for user_id in user_ids))
+        keys = [self._get_memory_key(memory_key) for memory_key in memory_keys]
+        summary_keys = [self._get_summary_key(memory_key) for memory_key in memory_keys]
+
+        for i in range(0, len(keys), UNLINK_BATCH_SIZE):
+            pipe.unlink(*keys[i:i + UNLINK_BATCH_SIZE])
+            pipe.unlink(*summary_keys[i:i + UNLINK_BATCH_SIZE])
+        pipe.unlink(self._get_owner_index_key(owner_id))
+
+    def _cleared_count(self, results: List[Any]) -> int:
+        # Só os unlink das memórias contam; os dos resumos e o do índice, não.
+        return sum(results[:-1:2])
+
+    def _queue_owner_memories_info(self, pipe, owner_id: str, user_ids: List[str]):
+        for user_id in user_ids:
+            self._queue_memory_info(pipe, self._get_memory_key(f"{owner_id}:{user_id}"))
+
+    def _queue_memory_info(self, pipe, redis_key: str):
+        if self.uses_list_storage:
+            pipe.llen(redis_key)
+            pipe.lrange(redis_key, -5, -1)
+        else:
+            pipe.get(redis_key)
+
+    def _memory_info_from_results(self, results: List[Any]) -> Dict[str, Any]:
+        if self.uses_list_storage:
+            message_count, entries = results
+            return self._build_memory_info(
+                self._deserialize_entries(entries), message_count)
+        return self._build_memory_info(self._deserialize_messages(results[0]))
+
+    def _info_commands_per_key(self) -> int:
+        return 2 if self.uses_list_storage else 1
+
+    def _memory_infos_from_results(self, user_ids: List[str],
+                                   results: List[Any]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Info de cada usuário; None quando o pipeline falhou para a chave (ex.: WRONGTYPE)."""
+        step = self._info_commands_per_key()
+        infos = {}
+        for i, user_id in enumerate(user_ids):
+            user_results = results[i * step:(i + 1) * step]
+            if any(isinstance(r, Exception) for r in user_results):
+                infos[user_id] = None
+            else:
+                infos[user_id] = self._memory_info_from_results(user_results)
+        return infos
+
+    def _owner_memories_info(self, owner_id: str, infos: Dict[str, Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """Memórias existentes do owner e os user_ids do índice que já expiraram."""
+        users_info = []
+        stale_user_ids = []
+        for user_id, user_info in infos.items():
+            if not user_info["has_memory"]:
+                stale_user_ids.append(user_id)
+                continue
+
+            user_info["owner_id"] = owner_id
+            user_info["user_id"] = user_id
+            users_info.append(user_info)
+        return users_info, stale_user_ids
+
+    def _new_memory(self, messages: List[BaseMessage] = None,
+                    summary_message: BaseMessage = None) -> ConversationBufferWindowMemory:
+        memory = TokenBudgetWindowMemory(
+            k=self.memory_window,
+            max_token_limit=self.token_budget,
+            summary_message=summary_message,
+            return_messages=True,
+            memory_key="chat_history"
+        )
+
+        for msg in messages or []:
+            memory.chat_memory.add_message(msg)
+
+        return memory
+
+    def _message_to_dict(self, msg: BaseMessage) -> Dict[str, Any]:
+        return {
+            "type": msg.__class__.__name__,
+            "content": msg.content,
+            "tokens": message_tokens(msg)
+        }
+
+    def _message_from_dict(self, msg_data: Dict[str, Any]) -> Optional[BaseMessage]:
+        # Mensagens gravadas antes da contagem de tokens não têm "tokens"; são contadas ao usar.
+        token_count = msg_data.get("tokens")
+        if msg_data["type"] == "HumanMessage":
+            return HumanMessage(content=msg_data["content"], token_count=token_count)
+        elif msg_data["type"] == "AIMessage":
+            return AIMessage(content=msg_data["content"], token_count=token_count)
+        return None
 
     def _serialize_messages(self, messages: List[BaseMessage]) -> str:
-        serialized = []
-        for msg in messages:
-            serialized.append({
-                "type": msg.__class__.__name__,
-                "content": msg.content
-            })
-        return json.dumps(serialized)
+        return json.dumps([self._message_to_dict(msg) for msg in messages])
 
     def _deserialize_messages(self, data: str) -> List[BaseMessage]:
         if not data:
             return []
 
         try:
-            messages_data = json.loads(data)
-            messages = []
-            for msg_data in messages_data:
-                if msg_data["type"] == "HumanMessage":
-                    messages.append(HumanMessage(content=msg_data["content"]))
-                elif msg_data["type"] == "AIMessage":
-                    messages.append(AIMessage(content=msg_data["content"]))
-            return messages
+            messages = [self._message_from_dict(msg_data)
+                        for msg_data in json.loads(data)]
+            return [msg for msg in messages if msg is not None]
         except Exception as e:
-            logger.error(f"Erro ao deserializar mensagens: {e}")
+            logger.error("Erro ao deserializar mensagens: %s", e)
             return []
 
-    def get_user_memory(self, memory_key: str) -> ConversationBufferWindowMemory:
+    def _serialize_entries(self, messages: List[BaseMessage]) -> List[str]:
+        return [json.dumps(self._message_to_dict(msg)) for msg in messages]
+
+    def _deserialize_entries(self, entries: List[str]) -> List[BaseMessage]:
+        messages = []
+        for entry in entries:
+            try:
+                msg = self._message_from_dict(json.loads(entry))
+            except Exception as e:
+                logger.error("Erro ao deserializar mensagem: %s", e)
+                continue
+            if msg is not None:
+                messages.append(msg)
+        return messages
+
+    def messages_from_entries(self, entries: List[str]) -> List[BaseMessage]:
+        """Mensagens das entradas cruas da lista, como as de get_compaction_batch."""
+        return self._deserialize_entries(entries)
+
+    def _window_start(self) -> int:
+        return -self.memory_window * 2
+
+    def _summary_to_data(self, summary: str) -> str:
+        message = SystemMessage(content=SUMMARY_PREFIX + summary)
+        return json.dumps({"summary": summary, "tokens": message_tokens(message)})
+
+    def _summary_from_data(self, data: Optional[str]) -> Tuple[Optional[str], Optional[BaseMessage]]:
+        if not data:
+            return None, None
+
+        try:
+            summary_data = json.loads(data)
+        except Exception as e:
+            logger.error("Erro ao deserializar resumo da conversa: %s", e)
+            return None, None
+
+        summary = summary_data["summary"]
+        return summary, SystemMessage(
+            content=SUMMARY_PREFIX + summary, token_count=summary_data.get("tokens"))
+
+    def _compaction_size(self, message_count: int) -> int:
+        """Quantas mensagens do início da lista devem ir para o resumo."""
+        if message_count <= settings.MEMORY_SUMMARY_THRESHOLD:
+            return 0
+        return max(message_count + self._window_start(), 0)
+
+    def _is_wrong_type(self, e: Exception) -> bool:
+        return isinstance(e, redis.exceptions.ResponseError) and "WRONGTYPE" in str(e)
+
+    def _build_memory_info(self, messages: List[BaseMessage], message_count: int = None) -> Dict[str, Any]:
+        if message_count is None:
+            message_count = len(messages)
+
+        if not message_count:
+            return {
+                "has_memory": False,
+                "message_count": 0,
+                "memory_window": self.memory_window,
+                "storage": "redis"
+            }
+
+        return {
+            "has_memory": True,
+            "message_count": message_count,
+            "memory_window": self.memory_window,
+            "storage": "redis",
+            "recent_messages": [
+                {
+                    "type": msg.__class__.__name__,
+                    "content": msg.content[:100] + "..." if len(msg.content) > 100 else msg.content
+                }
+                for msg in messages[-5:]
+            ]
+        }
+
+    def _build_redis_info(self, info: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "connected": True,
+            "version": info.get("redis_version"),
+            "uptime": info.get("uptime_in_seconds"),
+            "memory_used": info.get("used_memory_human"),
+            "connected_clients": info.get("connected_clients")
+        }
+
+    def _unavailable_memory_info(self) -> Dict[str, Any]:
+        return {
+            "has_memory": False,
+            "message_count": 0,
+            "memory_window": self.memory_window,
+            "storage": "ram_fallback"
+        }
+
+    def _memories_info(self, next_cursor: int, keys: List[str]) -> Dict[str, Any]:
+        users = [self._memory_key_from_redis_key(key) for key in keys]
+        return {
+            "total_users": len(users),
+            "users": users,
+            "next_cursor": next_cursor,
+            "memory_window": self.memory_window,
+            "storage": "redis"
+        }
+
+    def _unavailable_memories_info(self) -> Dict[str, Any]:
+        return {
+            "total_users": 0,
+            "users": [],
+            "next_cursor": 0,
+            "memory_window": self.memory_window,
+            "storage": "ram_fallback"
+        }
+
+    def _memory_info_error(self, e: Exception) -> Dict[str, Any]:
+        return {
+            "has_memory": False,
+            "message_count": 0,
+            "memory_window": self.memory_window,
+            "storage": "error",
+            "error": str(e)
+        }
+
+    def _memories_info_error(self, e: Exception) -> Dict[str, Any]:
+        return {
+            "total_users": 0,
+            "users": [],
+            "next_cursor": 0,
+            "memory_window": self.memory_window,
+            "storage": "error",
+            "error": str(e)
+        }
+
+    def is_connected(self) -> bool:
+        return self.redis_client is not None
+
+    # Fluxo único para os dois clientes: os métodos abaixo são async e fazem
+    # todo I/O do Redis por call(), que aguarda o cliente assíncrono ou roda o
+    # síncrono em asyncio.to_thread. Os comandos enfileirados em pipeline não
+    # fazem I/O e são chamados direto.
+
+    async def call(self, func: Callable, *args, **kwargs) -> Any:
+        """Executa um comando do redis_client (ou de um pipeline) sem bloquear o event loop."""
+        if self.is_async:
+            return await func(*args, **kwargs)
+        return await asyncio.to_thread(func, *args, **kwargs)
+
+    @asynccontextmanager
+    async def _pipeline(self, transaction: bool = True):
+        pipe = self.redis_client.pipeline(transaction=transaction)
+        try:
+            yield pipe
+        finally:
+            await self.call(pipe.reset)
+
+    async def _execute(self, pipe, **kwargs) -> List[Any]:
+        return await self.call(pipe.execute, **kwargs)
+
+    async def _scan_keys(self, match: str, count: int = None) -> AsyncIterator[List[str]]:
+        cursor = 0
+        while True:
+            cursor, keys = await self.call(
+                self.redis_client.scan, cursor, match=match, count=count)
+            yield keys
+            if cursor == 0:
+                break
+
+    async def _migrate_legacy_key(self, redis_key: str) -> bool:
+        async with self._pipeline() as pipe:
+            try:
+                await self.call(pipe.watch, redis_key)
+                if await self.call(pipe.type, redis_key) != "string":
+                    return False
+
+                data = await self.call(pipe.get, redis_key)
+                ttl = await self.call(pipe.ttl, redis_key)
+
+                pipe.multi()
+                self._queue_legacy_migration(pipe, redis_key, data, ttl)
+                await self._execute(pipe)
+            except redis.exceptions.WatchError:
+                return False
+
+        logger.info("Memória %s migrada para lista", redis_key)
+        return True
+
+    async def migrate_legacy_memories(self) -> int:
+        if not self.redis_client:
+            logger.warning("Redis não conectado")
+            return 0
+
+        migrated = 0
+        owner_ids = set()
+        async for keys in self._scan_keys(f"{MEMORY_KEY_PREFIX}*"):
+            for redis_key in keys:
+                memory_key = self._memory_key_from_redis_key(redis_key)
+                owner_ids.add(self._split_memory_key(memory_key)[0])
+                if await self._migrate_legacy_key(redis_key):
+                    migrated += 1
+                else:
+                    async with self._pipeline(transaction=False) as pipe:
+                        self._queue_index_update(pipe, memory_key)
+                        await self._execute(pipe)
+
+        async with self._pipeline(transaction=False) as pipe:
+            self._queue_owner_index_ready(pipe, list(owner_ids))
+            await self._execute(pipe)
+        return migrated
+
+    async def _read_messages(self, redis_key: str, start: int) -> List[BaseMessage]:
+        if not self.uses_list_storage:
+            return self._deserialize_messages(await self.call(self.redis_client.get, redis_key))
+
+        try:
+            return self._deserialize_entries(
+                await self.call(self.redis_client.lrange, redis_key, start, -1))
+        except redis.exceptions.ResponseError as e:
+            if not self._is_wrong_type(e):
+                raise
+            await self._migrate_legacy_key(redis_key)
+            return self._deserialize_entries(
+                await self.call(self.redis_client.lrange, redis_key, start, -1))
+
+    @timed(REDIS_OPERATION_SECONDS, "get_user_memory")
+    async def get_user_memory(self, memory_key: str) -> ConversationBufferWindowMemory:
         if not self.redis_client:
             logger.warning("Redis não conectado, usando memória em RAM")
-            return ConversationBufferWindowMemory(
-                k=self.memory_window,
-                return_messages=True,
-                memory_key="chat_history"
-            )
+            return self._new_memory()
 
         try:
             redis_key = self._get_memory_key(memory_key)
 
-            messages_data = self.redis_client.get(redis_key)
+            messages = await self._read_messages(redis_key, self._window_start())
+            summary_message = None
+            if self.uses_summary:
+                _, summary_message = self._summary_from_data(
+                    await self.call(self.redis_client.get, self._get_summary_key(memory_key)))
 
-            if messages_data:
-                messages = self._deserialize_messages(messages_data)
-                logger.info(
-                    f"Memória carregada do Redis para {memory_key} ({len(messages)} mensagens)")
+            if messages:
+                logger.debug(
+                    "Memória carregada do Redis para %s (%s mensagens)", memory_key, len(messages))
             else:
-                messages = []
-                logger.info(f"Nova memória criada para {memory_key}")
-
-            memory = ConversationBufferWindowMemory(
-                k=self.memory_window,
-                return_messages=True,
-                memory_key="chat_history"
-            )
-
-            for msg in messages:
-                memory.chat_memory.add_message(msg)
+                logger.debug("Nova memória criada para %s", memory_key)
 
-            return memory
+            return self._new_memory(messages, summary_message)
 
         except Exception as e:
-            logger.error(f"Erro ao obter memória do Redis: {e}")
-            return ConversationBufferWindowMemory(
-                k=self.memory_window,
-                return_messages=True,
-                memory_key="chat_history"
-            )
+            logger.error("Erro ao obter memória do Redis: %s", e)
+            return self._new_memory()
 
-    def save_user_memory(self, memory_key: str, memory: ConversationBufferWindowMemory) -> bool:
+    @timed(REDIS_OPERATION_SECONDS, "save_user_memory")
+    async def save_user_memory(self, memory_key: str, memory: ConversationBufferWindowMemory) -> bool:
         if not self.redis_client:
             logger.warning("Redis não conectado, memória não será persistida")
             return False
 
         try:
-            redis_key = self._get_memory_key(memory_key)
+            messages = memory.chat_memory.messages
 
-            messages_data = self._serialize_messages(
-                memory.chat_memory.messages)
-
-            self.redis_client.setex(
-                redis_key, 7 * 24 * 60 * 60, messages_data)
+            async with self._pipeline() as pipe:
+                self._queue_save(pipe, memory_key, messages)
+                await self._execute(pipe)
 
             logger.info(
-                f"Memória salva no Redis para {memory_key} ({len(memory.chat_memory.messages)} mensagens)")
+                "Memória salva no Redis para %s (%s mensagens)", memory_key, len(messages))
             return True
 
         except Exception as e:
-            logger.error(f"Erro ao salvar memória no Redis: {e}")
+            logger.error("Erro ao salvar memória no Redis: %s", e)
             return False
 
-    def clear_user_memory(self, memory_key: str) -> bool:
+    @timed(REDIS_OPERATION_SECONDS, "append_user_turn")
+    async def append_user_turn(self, memory_key: str, memory: ConversationBufferWindowMemory,
+                               new_messages: List[BaseMessage]) -> bool:
+        if not self.uses_list_storage:
+            return await self.save_user_memory(memory_key, memory)
+
+        if not self.redis_client:
+            logger.warning("Redis não conectado, memória não será persistida")
+            return False
+
+        redis_key = self._get_memory_key(memory_key)
+        entries = self._serialize_entries(new_messages)
+
+        async def _append():
+            async with self._pipeline() as pipe:
+                self._queue_append(pipe, memory_key, entries)
+                await self._execute(pipe)
+
+        try:
+            try:
+                await _append()
+            except redis.exceptions.ResponseError as e:
+                if not self._is_wrong_type(e):
+                    raise
+                await self._migrate_legacy_key(redis_key)
+                await _append()
+
+            logger.debug(
+                "Turno adicionado no Redis para %s (%s mensagens)", memory_key, len(entries))
+            return True
+
+        except Exception as e:
+            logger.error("Erro ao salvar memória no Redis: %s", e)
+            return False
+
+    async def get_compaction_batch(self, memory_key: str) -> Tuple[Optional[str], List[str]]:
+        """Resumo atual e entradas do início da lista que já devem ser resumidas."""
+        redis_key = self._get_memory_key(memory_key)
+
+        async with self._pipeline(transaction=False) as pipe:
+            self._queue_compaction_state(pipe, memory_key)
+            message_count, data = await self._execute(pipe)
+
+        count = self._compaction_size(message_count)
+        if not count:
+            return None, []
+
+        summary, _ = self._summary_from_data(data)
+        return summary, await self.call(self.redis_client.lrange, redis_key, 0, count - 1)
+
+    async def save_compaction(self, memory_key: str, summary: str, entries: List[str]) -> bool:
+        """Grava o resumo e tira da lista as `entries` resumidas.
+
+        Desiste se o início da lista mudou desde `get_compaction_batch`
+        (memória limpa ou cortada por outra requisição).
+        """
+        redis_key = self._get_memory_key(memory_key)
+
+        async with self._pipeline() as pipe:
+            for _ in range(COMPACTION_RETRIES):
+                try:
+                    await self.call(pipe.watch, redis_key)
+                    if await self.call(pipe.lrange, redis_key, 0, len(entries) - 1) != entries:
+                        return False
+
+                    pipe.multi()
+                    self._queue_compaction_save(pipe, memory_key, summary, len(entries))
+                    await self._execute(pipe)
+                    return True
+                except redis.exceptions.WatchError:
+                    # Um turno novo entrou no fim da lista; o início continua válido.
+                    continue
+        return False
+
+    async def clear_user_memory(self, memory_key: str) -> bool:
         if not self.redis_client:
             logger.warning("Redis não conectado")
             return False
 
         try:
-            redis_key = self._get_memory_key(memory_key)
-            result = self.redis_client.delete(redis_key)
+            async with self._pipeline() as pipe:
+                self._queue_clear_user(pipe, memory_key)
+                result, _ = await self._execute(pipe)
 
             if result:
                 logger.info(
-                    f"Memória limpa no Redis para {memory_key}")
+                    "Memória limpa no Redis para %s", memory_key)
                 return True
             else:
                 logger.info(
-                    f"Nenhuma memória encontrada para {memory_key}")
+                    "Nenhuma memória encontrada para %s", memory_key)
                 return False
 
         except Exception as e:
-            logger.error(f"Erro ao limpar memória no Redis: {e}")
+            logger.error("Erro ao limpar memória no Redis: %s", e)
             return False
 
-    def get_user_memory_info(self, memory_key: str) -> Dict[str, Any]:
+    async def _ensure_owner_index(self, owner_id: str):
+        """Preenche o índice do owner com um SCAN completo enquanto ele não estiver marcado como completo."""
+        if await self.call(self.redis_client.exists, self._get_owner_index_ready_key(owner_id)):
+            return
+
+        keys = []
+        async for batch in self._scan_keys(f"{self._owner_memory_prefix(owner_id)}*", UNLINK_BATCH_SIZE):
+            keys.extend(batch)
+        async with self._pipeline(transaction=False) as pipe:
+            self._queue_owner_index_backfill(
+                pipe, owner_id, self._user_ids_from_keys(owner_id, keys))
+            await self._execute(pipe)
+
+    async def _scan_owner_user_ids(self, owner_id: str, cursor: int, count: int) -> Tuple[int, List[str]]:
+        # A fonte é sempre o índice; o backfill acontece só no início da
+        # paginação para o cursor não trocar de SCAN para SSCAN no meio.
+        if cursor == 0:
+            await self._ensure_owner_index(owner_id)
+        return await self.call(
+            self.redis_client.sscan, self._get_owner_index_key(owner_id), cursor, count=count)
+
+    async def _owner_user_ids(self, owner_id: str) -> List[str]:
+        user_ids = []
+        cursor = 0
+        while True:
+            cursor, batch = await self._scan_owner_user_ids(
+                owner_id, cursor, UNLINK_BATCH_SIZE)
+            user_ids.extend(batch)
+            if cursor == 0:
+                return user_ids
+
+    async def clear_owner_memories(self, owner_id: str) -> int:
         if not self.redis_client:
-            return {
-                "has_memory": False,
-                "message_count": 0,
-                "memory_window": self.memory_window,
-                "storage": "ram_fallback"
-            }
+            logger.warning("Redis não conectado")
+            return 0
 
         try:
-            redis_key = self._get_memory_key(memory_key)
-            messages_data = self.redis_client.get(redis_key)
-
-            if not messages_data:
-                return {
-                    "has_memory": False,
-                    "message_count": 0,
-                    "memory_window": self.memory_window,
-                    "storage": "redis"
-                }
+            user_ids = await self._owner_user_ids(owner_id)
+            async with self._pipeline(transaction=False) as pipe:
+                self._queue_clear_owner(pipe, owner_id, user_ids)
+                results = await self._execute(pipe)
 
-            messages = self._deserialize_messages(messages_data)
+            return self._cleared_count(results)
 
-            return {
-                "has_memory": True,
-                "message_count": len(messages),
-                "memory_window": self.memory_window,
-                "storage": "redis",
-                "recent_messages": [
-                    {
-                        "type": msg.__class__.__name__,
-                        "content": msg.content[:100] + "..." if len(msg.content) > 100 else msg.content
-                    }
-                    for msg in messages[-5:]
-                ]
-            }
+        except Exception as e:
+            logger.error("Erro ao limpar memórias do owner %s no Redis: %s", owner_id, e)
+            return 0
+
+    async def get_owner_memories_info(self, owner_id: str, cursor: int = 0, count: int = 50) -> Tuple[int, List[Dict[str, Any]]]:
+        if not self.redis_client:
+            return 0, []
+
+        try:
+            next_cursor, user_ids = await self._scan_owner_user_ids(
+                owner_id, cursor, count)
+            if not user_ids:
+                return next_cursor, []
+
+            async with self._pipeline(transaction=False) as pipe:
+                self._queue_owner_memories_info(pipe, owner_id, user_ids)
+                results = await self._execute(pipe, raise_on_error=False)
+
+            infos = self._memory_infos_from_results(user_ids, results)
+            for user_id, user_info in infos.items():
+                if user_info is None:
+                    infos[user_id] = await self.get_user_memory_info(f"{owner_id}:{user_id}")
+
+            users_info, stale_user_ids = self._owner_memories_info(owner_id, infos)
+            if stale_user_ids:
+                await self.call(
+                    self.redis_client.srem, self._get_owner_index_key(owner_id), *stale_user_ids)
+
+            return next_cursor, users_info
 
         except Exception as e:
-            logger.error(f"Erro ao obter informações da memória: {e}")
-            return {
-                "has_memory": False,
-                "message_count": 0,
-                "memory_window": self.memory_window,
-                "storage": "error",
-                "error": str(e)
-            }
+            logger.error("Erro ao obter memórias do owner %s no Redis: %s", owner_id, e)
+            return 0, []
 
-    def get_all_memories_info(self) -> Dict[str, Any]:
+    async def get_user_memory_info(self, memory_key: str) -> Dict[str, Any]:
         if not self.redis_client:
-            return {
-                "total_users": 0,
-                "users": [],
-                "memory_window": self.memory_window,
-                "storage": "ram_fallback"
-            }
+            return self._unavailable_memory_info()
 
         try:
-            pattern = "agent_memory:*"
-            keys = self.redis_client.keys(pattern)
+            redis_key = self._get_memory_key(memory_key)
 
-            users = []
-            for key in keys:
-                owner_id = key.replace("agent_memory:", "")
-                users.append(owner_id)
+            if not self.uses_list_storage:
+                return self._build_memory_info(
+                    self._deserialize_messages(await self.call(self.redis_client.get, redis_key)))
 
-            return {
-                "total_users": len(users),
-                "users": users,
-                "memory_window": self.memory_window,
-                "storage": "redis"
-            }
+            messages = await self._read_messages(redis_key, -5)
+            return self._build_memory_info(
+                messages, await self.call(self.redis_client.llen, redis_key))
 
         except Exception as e:
-            logger.error(f"Erro ao obter informações das memórias: {e}")
-            return {
-                "total_users": 0,
-                "users": [],
-                "memory_window": self.memory_window,
-                "storage": "error",
-                "error": str(e)
-            }
+            logger.error("Erro ao obter informações da memória: %s", e)
+            return self._memory_info_error(e)
 
-    def is_connected(self) -> bool:
-        return self.redis_client is not None
+    async def get_all_memories_info(self, cursor: int = 0, count: int = 50) -> Dict[str, Any]:
+        if not self.redis_client:
+            return self._unavailable_memories_info()
+
+        try:
+            next_cursor, keys = await self.call(
+                self.redis_client.scan, cursor, match=f"{MEMORY_KEY_PREFIX}*", count=count)
+            return self._memories_info(next_cursor, keys)
 
-    def get_redis_info(self) -> Dict[str, Any]:
+        except Exception as e:
+            logger.error("Erro ao obter informações das memórias: %s", e)
+            return self._memories_info_error(e)
+
+    async def get_redis_info(self) -> Dict[str, Any]:
         if not self.redis_client:
             return {"connected": False, "error": "Redis não conectado"}
 
         try:
-            info = self.redis_client.info()
-            return {
-                "connected": True,
-                "version": info.get("redis_version"),
-                "uptime": info.get("uptime_in_seconds"),
-                "memory_used": info.get("used_memory_human"),
-                "connected_clients": info.get("connected_clients")
-            }
+            return self._build_redis_info(await self.call(self.redis_client.info))
         except Exception as e:
             return {"connected": False, "error": str(e)}
+
+
+class RedisMemoryManager(BaseMemoryManager):
+    """Cliente síncrono: cada comando roda em asyncio.to_thread."""
+
+    def __init__(self, redis_url: str = None, memory_window: int = 10,
+                 storage: str = None, max_messages: int = None, token_budget: int = None):
+        super().__init__(redis_url, memory_window, storage, max_messages, token_budget)
+        self._connect()
+
+    def _connect(self):
+        try:
+            self.redis_client = redis.from_url(
+                self.redis_url, decode_responses=True)
+            self.redis_client.ping()
+            logger.info("Conectado ao Redis com sucesso")
+        except Exception as e:
+            logger.error("Erro ao conectar ao Redis: %s", e)
+            self.redis_client = None
+
+
+class AsyncRedisMemoryManager(BaseMemoryManager):
+    is_async = True
+
+    def __init__(self, redis_url: str = None, memory_window: int = 10,
+                 storage: str = None, max_messages: int = None,
+                 max_connections: int = None, socket_timeout: float = None,
+                 health_check_interval: int = None, token_budget: int = None):
+        super().__init__(redis_url, memory_window, storage, max_messages, token_budget)
+        self.max_connections = max_connections or settings.REDIS_MAX_CONNECTIONS
+        self.socket_timeout = socket_timeout or settings.REDIS_SOCKET_TIMEOUT
+        self.health_check_interval = health_check_interval or settings.REDIS_HEALTH_CHECK_INTERVAL
+        self.pool: Optional[aioredis.ConnectionPool] = None
+
+    async def connect(self):
+        try:
+            self.pool = aioredis.ConnectionPool.from_url(
+                self.redis_url,
+                decode_responses=True,
+                max_connections=self.max_connections,
+                socket_timeout=self.socket_timeout,
+                socket_connect_timeout=self.socket_timeout,
+                health_check_interval=self.health_check_interval
+            )
+            client = aioredis.Redis(connection_pool=self.pool)
+            await client.ping()
+            self.redis_client = client
+            logger.info(
+                "Conectado ao Redis (async) com pool de até %s conexões", self.max_connections)
+        except Exception as e:
+            logger.error("Erro ao conectar ao Redis: %s", e)
+            if self.pool:
+                await self.pool.disconnect()
+            self.pool = None
+            self.redis_client = None
+
+    async def disconnect(self):
+        if self.redis_client:
+            await self.redis_client.aclose()
+            self.redis_client = None
+        if self.pool:
+            await self.pool.disconnect()
+            self.pool = None
+            logger.info("Conexão com Redis fechada")
@@ -0,0 +1,94 @@
+import logging
+from functools import lru_cache
+from typing import List, Optional
+import tiktoken
+from langchain.memory import ConversationBufferWindowMemory
+from langchain_core.messages import BaseMessage, get_buffer_string
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Tokens fixos que a API cobra por mensagem (papel e delimitadores).
+MESSAGE_OVERHEAD_TOKENS = 4
+# Estimativa usada quando o encoding do tiktoken não pode ser carregado.
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(name: str) -> Optional[tiktoken.Encoding]:
+    try:
+        return tiktoken.get_encoding(name)
+    except Exception as e:
+        logger.warning(
+            "Encoding '%s' do tiktoken indisponível, estimando tokens por caracteres: %s", name, e)
+        return None
+
+
+def load_encoding() -> Optional[tiktoken.Encoding]:
+    """Carrega o encoding configurado; na primeira vez o tiktoken baixa o arquivo BPE.
+
+    Chamado na inicialização (fora do event loop) para que a contagem de
+    tokens no caminho das requisições nunca faça I/O de rede.
+    """
+    return _get_encoding(settings.MEMORY_TOKEN_ENCODING)
+
+
+def count_tokens(text: str) -> int:
+    encoding = load_encoding()
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def message_tokens(msg: BaseMessage) -> int:
+    """Tokens da mensagem, calculados uma única vez e guardados em `token_count`."""
+    token_count = getattr(msg, "token_count", None)
+    if token_count is None:
+        token_count = count_tokens(msg.content) + MESSAGE_OVERHEAD_TOKENS
+        msg.token_count = token_count
+    return token_count
+
+
+class TokenBudgetWindowMemory(ConversationBufferWindowMemory):
+    """Janela de `k` trocas limitada também por `max_token_limit` tokens.
+
+    O histórico é cortado das mensagens mais antigas para as mais novas, sempre
+    no início de uma troca (mensagem do usuário). Com `max_token_limit` 0 o
+    comportamento é o da janela simples. O `summary_message` (resumo das trocas
+    que já saíram da janela) vai na frente e conta no limite.
+    """
+
+    max_token_limit: int = 0
+    summary_message: Optional[BaseMessage] = None
+
+    @property
+    def buffer_as_messages(self) -> List[BaseMessage]:
+        messages = super().buffer_as_messages
+        summary = [self.summary_message] if self.summary_message else []
+        if not self.max_token_limit:
+            return summary + messages
+
+        total = sum(message_tokens(msg) for msg in summary)
+        if total > self.max_token_limit:
+            summary, total = [], 0
+
+        start = len(messages)
+        for index in range(len(messages) - 1, -1, -1):
+            total += message_tokens(messages[index])
+            if total > self.max_token_limit:
+                break
+            if messages[index].type == "human":
+                start = index
+
+        if start:
+            logger.debug(
+                "Histórico cortado pelo limite de %s tokens: %s de %s mensagens removidas", self.max_token_limit, start, len(messages))
+        return summary + messages[start:]
+
+    @property
+    def buffer_as_str(self) -> str:
+        return get_buffer_string(
+            self.buffer_as_messages,
+            human_prefix=self.human_prefix,
+            ai_prefix=self.ai_prefix,
+        )
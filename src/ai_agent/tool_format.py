@@ -0,0 +1,83 @@
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+from src.config import settings
+from src.models.models import CargaResult, DocumentoInfo
+
+# Saída das ferramentas em TSV: uma linha de cabeçalho e uma por registro,
+# sem rótulos repetidos nem campos vazios. É o que volta ao LLM e fica na
+# memória da conversa, então cada token economizado pesa em todos os turnos.
+
+EMPTY_VALUES = (None, "", "N/A", "None")
+CELL_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def _local(cidade: Optional[str], estado: Optional[str]) -> Optional[str]:
+    return "/".join(value for value in (cidade, estado) if value not in EMPTY_VALUES) or None
+
+
+def _documento(doc: DocumentoInfo) -> str:
+    return " ".join(str(value) for value in (
+        doc.tipo_documento, doc.numero, doc.chave, doc.data_emissao) if value not in EMPTY_VALUES)
+
+
+CARGA_FIELDS: Dict[str, Callable[[CargaResult], Any]] = {
+    "codigo": lambda carga: carga.codigo,
+    "status": lambda carga: carga.status,
+    "pedido": lambda carga: carga.pedido_embarcador,
+    "remetente": lambda carga: carga.nome_empresa_remetente,
+    "origem": lambda carga: _local(carga.cidade_remetente, carga.estado_remetente),
+    "endereco_remetente": lambda carga: carga.endereco_remetente,
+    "destinatario": lambda carga: carga.nome_empresa_destinatario,
+    "destino": lambda carga: _local(carga.cidade_destinatario, carga.estado_destinatario),
+    "endereco_destinatario": lambda carga: carga.endereco_destinatario,
+    "criacao": lambda carga: carga.data_criacao_carga.date() if carga.data_criacao_carga else None,
+    "documentos": lambda carga: "; ".join(_documento(doc) for doc in carga.documentos),
+}
+
+# Detalhes de uma carga trazem todos os campos; as listagens, os de TOOL_OUTPUT_FIELDS.
+DETAIL_FIELDS = list(CARGA_FIELDS)
+
+_output_format: ContextVar[Optional[str]] = ContextVar("tool_output_format", default=None)
+
+
+@contextmanager
+def output_format(name: str):
+    """Força o formato das ferramentas no bloco (ex.: "text" nas respostas diretas ao usuário)."""
+    token = _output_format.set(name)
+    try:
+        yield
+    finally:
+        _output_format.reset(token)
+
+
+def compact_output() -> bool:
+    return (_output_format.get() or settings.TOOL_OUTPUT_FORMAT) == "compact"
+
+
+def list_fields() -> List[str]:
+    fields = [field.strip() for field in settings.TOOL_OUTPUT_FIELDS.split(",")]
+    return [field for field in fields if field in CARGA_FIELDS]
+
+
+def _cell(value: Any) -> str:
+    if value in EMPTY_VALUES:
+        return ""
+    return CELL_WHITESPACE_PATTERN.sub(" ", str(value)).strip()
+
+
+def format_table(rows: List[Dict[str, Any]], columns: List[str]) -> str:
+    """Monta o TSV, sem as colunas que não têm valor em nenhuma linha."""
+    cells = [{column: _cell(row.get(column)) for column in columns} for row in rows]
+    columns = [column for column in columns if any(row[column] for row in cells)]
+
+    lines = ["\t".join(columns)]
+    lines.extend("\t".join(row[column] for column in columns) for row in cells)
+    return "\n".join(lines)
+
+
+def format_cargas(cargas: List[CargaResult], fields: Optional[List[str]] = None) -> str:
+    fields = fields or list_fields()
+    rows = [{field: CARGA_FIELDS[field](carga) for field in fields} for carga in cargas]
+    return format_table(rows, fields)
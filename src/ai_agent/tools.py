@@ -1,87 +1,147 @@
+import asyncio
+import functools
 import logging
-from typing import List, Dict, Any, Optional
+from contextvars import ContextVar
+from typing import List, Dict, Optional
 from langchain_core.tools import tool
+from src.config import settings
 from src.db.database import db_manager
+from src.models.models import CargaResult
+from src.ai_agent.tool_format import DETAIL_FIELDS, compact_output, format_cargas, format_table, list_fields
 
 logger = logging.getLogger(__name__)
 
+STATUS_LIST_LIMIT = 10
+STATUS_SUMMARY_LIMIT = 50
+LIST_ALL_MAX_LIMIT = 100
 
-@tool
-async def search_carga_by_identifier(identifier: str, owner_id: str) -> str:
-    """Busca uma carga específica pelo identificador (código ou número do documento).
+# O AgentExecutor roda com asyncio.gather as chamadas de ferramenta que o
+# modelo pede num mesmo turno; cada uma ocupa uma conexão do pool, então o
+# turno só executa TOOL_CONCURRENCY delas ao mesmo tempo.
+_turn_tool_slots: ContextVar[Optional[asyncio.Semaphore]] = ContextVar(
+    "turn_tool_slots", default=None)
+# Cargas retornadas pelas ferramentas no turno, por oferta_id, devolvidas
+# estruturadas na resposta do /ask sem consultar o banco de novo.
+_turn_cargas: ContextVar[Optional[Dict[str, CargaResult]]] = ContextVar(
+    "turn_cargas", default=None)
 
-    Args:
-        identifier: Código da carga ou número do documento
-        owner_id: ID do proprietário da carga
 
-    Returns:
-        String com informações da carga encontrada ou mensagem de erro
-    """
-    try:
-        logger.info(
-            f"Buscando carga por identificador: {identifier} para owner: {owner_id}")
-        data = await db_manager.search_carga_by_identifier(identifier, owner_id)
+def start_tool_turn():
+    """Abre o limite de ferramentas simultâneas e a coleta de cargas do turno na task atual."""
+    _turn_tool_slots.set(asyncio.Semaphore(settings.TOOL_CONCURRENCY))
+    _turn_cargas.set({})
 
-        if not data:
-            return f"Nenhuma carga encontrada com o identificador '{identifier}'"
 
-        cargas_unicas = {}
-        documentos_por_carga = {}
+def collected_cargas() -> List[CargaResult]:
+    return list((_turn_cargas.get() or {}).values())
 
-        for item in data:
-            codigo = item.get('codigo', 'N/A')
-            if codigo not in cargas_unicas:
-                cargas_unicas[codigo] = item
-                documentos_por_carga[codigo] = []
-
-            doc_info = {
-                'numero': item.get('numero_documento', 'N/A'),
-                'tipo': item.get('tipo_documento', 'N/A'),
-                'chave': item.get('chave_documento', 'N/A'),
-                'data_emissao': item.get('data_emissao', 'N/A')
-            }
-            documentos_por_carga[codigo].append(doc_info)
-
-        if len(cargas_unicas) == 1:
-            codigo = list(cargas_unicas.keys())[0]
-            item = cargas_unicas[codigo]
-            documentos = documentos_por_carga[codigo]
-
-            response = f"""
+
+def _collect(cargas: List[CargaResult]):
+    collected = _turn_cargas.get()
+    if collected is not None:
+        for carga in cargas:
+            collected.setdefault(carga.oferta_id, carga)
+
+
+def limit_concurrency(func):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        slots = _turn_tool_slots.get()
+        if slots is None:
+            return await func(*args, **kwargs)
+        async with slots:
+            return await func(*args, **kwargs)
+    return wrapper
+
+
+def _format_compact_results(results: Dict[str, List[CargaResult]], fields: List[str],
+                            not_found: str) -> str:
+    """Uma tabela com as cargas de todos os identificadores, sem repetir cargas."""
+    lines = [not_found.format(identifier) for identifier, data in results.items() if not data]
+    cargas = {carga.oferta_id: carga for data in results.values() for carga in data}
+    if cargas:
+        lines.append(format_cargas(list(cargas.values()), fields))
+    return "\n".join(lines)
+
+
+def _format_identifier_result(identifier: str, data: List[CargaResult]) -> str:
+    if not data:
+        return f"Nenhuma carga encontrada com o identificador '{identifier}'"
+
+    if len(data) == 1:
+        carga = data[0]
+        documentos = carga.documentos
+
+        response = f"""
 Carga encontrada:
-• Código: {item.get('codigo', 'N/A')}
-• Status: {item.get('status', 'N/A')}
-• Pedido Embarcador: {item.get('pedido_embarcador', 'N/A')}
-• Remetente: {item.get('nome_empresa_remetente', 'N/A')} - {item.get('cidade_remetente', 'N/A')}/{item.get('estado_remetente', 'N/A')}
-• Destinatário: {item.get('nome_empresa_destinatario', 'N/A')} - {item.get('cidade_destinatario', 'N/A')}/{item.get('estado_destinatario', 'N/A')}
-            """.strip()
-
-            if len(documentos) == 1:
-                doc = documentos[0]
-                response += f"""
-• Documento: {doc['numero']} (Tipo: {doc['tipo']})
-• Chave: {doc['chave']}
-• Data Emissão: {doc['data_emissao']}"""
-            else:
-                response += f"\n• Documentos ({len(documentos)}):"
-                for i, doc in enumerate(documentos, 1):
-                    response += f"""
-  {i}. {doc['numero']} (Tipo: {doc['tipo']}) - Chave: {doc['chave']}"""
+• Código: {carga.codigo}
+• Status: {carga.status}
+• Pedido Embarcador: {carga.pedido_embarcador}
+• Remetente: {carga.nome_empresa_remetente} - {carga.cidade_remetente}/{carga.estado_remetente}
+• Destinatário: {carga.nome_empresa_destinatario} - {carga.cidade_destinatario}/{carga.estado_destinatario}
+        """.strip()
 
-            return response
+        if not documentos:
+            response += "\n• Documentos: nenhum"
+        elif len(documentos) == 1:
+            doc = documentos[0]
+            response += f"""
+• Documento: {doc.numero} (Tipo: {doc.tipo_documento})
+• Chave: {doc.chave}
+• Data Emissão: {doc.data_emissao}"""
         else:
-            response = f"Encontradas {len(cargas_unicas)} cargas com o identificador '{identifier}':\n\n"
-            for i, (codigo, item) in enumerate(cargas_unicas.items(), 1):
-                response += f"{i}. Código: {codigo} | Status: {item.get('status', 'N/A')} | Remetente: {item.get('nome_empresa_remetente', 'N/A')}\n"
+            response += f"\n• Documentos ({len(documentos)}):"
+            for i, doc in enumerate(documentos, 1):
+                response += f"""
+  {i}. {doc.numero} (Tipo: {doc.tipo_documento}) - Chave: {doc.chave}"""
 
-            return response
+        return response
+    else:
+        response = f"Encontradas {len(data)} cargas com o identificador '{identifier}':\n\n"
+        for i, carga in enumerate(data, 1):
+            response += f"{i}. Código: {carga.codigo} | Status: {carga.status} | Remetente: {carga.nome_empresa_remetente}\n"
+
+        return response
+
+
+@tool
+@limit_concurrency
+async def search_carga_by_identifier(identifiers: List[str], owner_id: str) -> str:
+    """Busca cargas pelos identificadores (código, número do documento, chave ou pedido).
+
+    Args:
+        identifiers: Códigos das cargas ou números dos documentos; passe todos
+            os identificadores da pergunta numa única chamada
+        owner_id: ID do proprietário da carga
+
+    Returns:
+        String com informações das cargas encontradas ou mensagem de erro
+    """
+    try:
+        logger.debug(
+            "Buscando cargas por identificadores: %s para owner: %s", identifiers, owner_id)
+        results = await db_manager.search_cargas_by_identifiers(identifiers, owner_id)
+        for data in results.values():
+            _collect(data)
+
+        if results and compact_output():
+            fields = list_fields()
+            if "documentos" not in fields:
+                fields.append("documentos")
+            return _format_compact_results(
+                results, fields, "Nenhuma carga encontrada com o identificador '{}'")
+
+        return "\n\n".join(
+            _format_identifier_result(identifier, data)
+            for identifier, data in results.items()) or "Nenhum identificador informado"
 
     except Exception as e:
-        logger.error(f"Erro ao buscar carga por identificador: {e}")
+        logger.error("Erro ao buscar carga por identificador: %s", e)
         return f"Erro ao buscar carga: {str(e)}"
 
 
 @tool
+@limit_concurrency
 async def search_cargas_by_status(status: str, owner_id: str) -> str:
     """Busca cargas por status específico.
 
@@ -94,151 +154,216 @@ async def search_cargas_by_status(status: str, owner_id: str) -> str:
     """
 
     try:
-        logger.info(
-            f"Buscando cargas por status: {status} para owner: {owner_id}")
-        data = await db_manager.search_cargas_by_status(status, owner_id)
+        logger.debug(
+            "Buscando cargas por status: %s para owner: %s", status, owner_id)
+        data, total = await asyncio.gather(
+            db_manager.search_cargas_by_status(
+                status, owner_id, STATUS_LIST_LIMIT),
+            db_manager.count_cargas_by_status(status, owner_id)
+        )
 
         if not data:
             return f"Nenhuma carga encontrada com status '{status}'"
+        _collect(data)
+
+        if compact_output():
+            fields = [field for field in list_fields() if field != "status"]
+            return (f"{total} cargas com status '{status}' (mostrando {len(data)}):\n"
+                    f"{format_cargas(data, fields)}")
 
-        response = f"Encontradas {len(data)} cargas com status '{status}':\n\n"
-        for i, item in enumerate(data[:10], 1):
-            response += f"{i}. Código: {item.get('codigo', 'N/A')} | Pedido: {item.get('pedido_embarcador', 'N/A')} | Remetente: {item.get('nome_empresa_remetente', 'N/A')}\n"
+        response = f"Encontradas {total} cargas com status '{status}':\n\n"
+        for i, carga in enumerate(data, 1):
+            response += f"{i}. Código: {carga.codigo} | Pedido: {carga.pedido_embarcador} | Remetente: {carga.nome_empresa_remetente}\n"
 
-        if len(data) > 10:
-            response += f"\n... e mais {len(data) - 10} cargas."
+        if total > len(data):
+            response += f"\n... e mais {total - len(data)} cargas."
 
         return response
 
     except Exception as e:
-        logger.error(f"Erro ao buscar cargas por status: {e}")
+        logger.error("Erro ao buscar cargas por status: %s", e)
         return f"Erro ao buscar cargas por status: {str(e)}"
 
 
 @tool
-async def list_all_cargas(owner_id: str, limit: int = 20) -> str:
-    """Lista todas as cargas de um proprietário com limite opcional.
+@limit_concurrency
+async def count_cargas_by_status(owner_id: str, status: Optional[str] = None, by_estado: bool = False) -> str:
+    """Conta cargas por status, sem listá-las. Use para perguntas como "quantas cargas estão em trânsito?".
 
     Args:
         owner_id: ID do proprietário das cargas
-        limit: Número máximo de cargas para retornar (padrão: 20)
+        status: Status para filtrar (opcional; sem ele conta todos os status)
+        by_estado: Se True, detalha a contagem por estado (UF) de destino
 
     Returns:
-        String com lista de cargas ou mensagem de erro
+        String com as contagens por status ou mensagem de erro
     """
 
     try:
-        logger.info(f"Listando todas as cargas para owner: {owner_id}")
-        data = await db_manager.get_all_cargas_by_owner(owner_id)
+        logger.debug(
+            "Contando cargas por status: %s para owner: %s", status, owner_id)
+        data = await db_manager.get_status_summary(
+            owner_id, status, by_estado, STATUS_SUMMARY_LIMIT)
 
         if not data:
+            if status:
+                return f"Nenhuma carga encontrada com status '{status}'"
             return "Nenhuma carga encontrada"
 
-        limited_data = data[:limit]
+        total = data[0]['total_cargas']
+        total_grupos = data[0]['total_grupos']
+        truncated_note = ""
+        if total_grupos > len(data):
+            truncated_note = f"\n(mostrando os {len(data)} maiores de {total_grupos} grupos)"
 
-        response = f"Encontradas {len(data)} cargas (mostrando {len(limited_data)}):\n\n"
-        for i, item in enumerate(limited_data, 1):
-            response += f"{i}. Código: {item.get('codigo', 'N/A')} | Status: {item.get('status', 'N/A')} | Pedido: {item.get('pedido_embarcador', 'N/A')} | Remetente: {item.get('nome_empresa_remetente', 'N/A')}\n"
+        if compact_output():
+            columns = ["status", "estado_destinatario", "total"] if by_estado else ["status", "total"]
+            return f"Total de cargas: {total}\n{format_table(data, columns)}{truncated_note}"
 
-        if len(data) > limit:
-            response += f"\n... e mais {len(data) - limit} cargas. Use um limite maior se necessário."
+        response = f"Total de cargas: {total}\n\n"
+        for item in data:
+            if by_estado:
+                response += f"• {item['status']} / {item['estado_destinatario']}: {item['total']}\n"
+            else:
+                response += f"• {item['status']}: {item['total']}\n"
 
-        return response
+        return response + truncated_note
 
     except Exception as e:
-        logger.error(f"Erro ao listar cargas: {e}")
-        return f"Erro ao listar cargas: {str(e)}"
+        logger.error("Erro ao contar cargas por status: %s", e)
+        return f"Erro ao contar cargas por status: {str(e)}"
 
 
 @tool
-async def get_carga_details(codigo: str, owner_id: str) -> str:
-    """Obtém detalhes completos de uma carga específica.
+@limit_concurrency
+async def list_all_cargas(owner_id: str, limit: int = 20) -> str:
+    """Lista todas as cargas de um proprietário com limite opcional.
 
     Args:
-        codigo: Código da carga
-        owner_id: ID do proprietário da carga
+        owner_id: ID do proprietário das cargas
+        limit: Número máximo de cargas para retornar (padrão: 20, máximo: 100)
 
     Returns:
-        String com detalhes completos da carga ou mensagem de erro
+        String com lista de cargas ou mensagem de erro
     """
 
     try:
-        logger.info(
-            f"Obtendo detalhes da carga: {codigo} para owner: {owner_id}")
-        data = await db_manager.search_carga_by_identifier(codigo, owner_id)
+        logger.debug("Listando todas as cargas para owner: %s", owner_id)
+        limit = min(max(limit, 1), LIST_ALL_MAX_LIMIT)
+        (data, _), total = await asyncio.gather(
+            db_manager.get_cargas_page_by_owner(owner_id, limit),
+            db_manager.count_cargas_by_owner(owner_id)
+        )
 
         if not data:
-            return f"Carga com código '{codigo}' não encontrada"
+            return "Nenhuma carga encontrada"
+        _collect(data)
 
-        cargas_unicas = {}
-        documentos_por_carga = {}
+        if compact_output():
+            return f"{total} cargas (mostrando {len(data)}):\n{format_cargas(data)}"
 
-        for item in data:
-            codigo_carga = item.get('codigo', 'N/A')
-            if codigo_carga not in cargas_unicas:
-                cargas_unicas[codigo_carga] = item
-                documentos_por_carga[codigo_carga] = []
-
-            doc_info = {
-                'numero': item.get('numero_documento', 'N/A'),
-                'tipo': item.get('tipo_documento', 'N/A'),
-                'chave': item.get('chave_documento', 'N/A'),
-                'data_emissao': item.get('data_emissao', 'N/A')
-            }
-            documentos_por_carga[codigo_carga].append(doc_info)
-
-        codigo = list(cargas_unicas.keys())[0]
-        item = cargas_unicas[codigo]
-        documentos = documentos_por_carga[codigo]
+        response = f"Encontradas {total} cargas (mostrando {len(data)}):\n\n"
+        for i, carga in enumerate(data, 1):
+            response += f"{i}. Código: {carga.codigo} | Status: {carga.status} | Pedido: {carga.pedido_embarcador} | Remetente: {carga.nome_empresa_remetente}\n"
 
-        response = f"""
+        if total > len(data):
+            response += f"\n... e mais {total - len(data)} cargas. Use um limite maior se necessário."
+
+        return response
+
+    except Exception as e:
+        logger.error("Erro ao listar cargas: %s", e)
+        return f"Erro ao listar cargas: {str(e)}"
+
+
+def _format_carga_details(carga: CargaResult) -> str:
+    documentos = carga.documentos
+
+    response = f"""
 DETALHES COMPLETOS DA CARGA:
 
-Código: {item.get('codigo', 'N/A')}
-Status: {item.get('status', 'N/A')}
-Pedido Embarcador: {item.get('pedido_embarcador', 'N/A')}
+Código: {carga.codigo}
+Status: {carga.status}
+Pedido Embarcador: {carga.pedido_embarcador}
 
 REMETENTE:
-• Empresa: {item.get('nome_empresa_remetente', 'N/A')}
-• Cidade: {item.get('cidade_remetente', 'N/A')}
-• Estado: {item.get('estado_remetente', 'N/A')}
+• Empresa: {carga.nome_empresa_remetente}
+• Cidade: {carga.cidade_remetente}
+• Estado: {carga.estado_remetente}
 
 DESTINATÁRIO:
-• Empresa: {item.get('nome_empresa_destinatario', 'N/A')}
-• Cidade: {item.get('cidade_destinatario', 'N/A')}
-• Estado: {item.get('estado_destinatario', 'N/A')}
-        """.strip()
+• Empresa: {carga.nome_empresa_destinatario}
+• Cidade: {carga.cidade_destinatario}
+• Estado: {carga.estado_destinatario}
+    """.strip()
 
-        if len(documentos) == 1:
-            doc = documentos[0]
-            response += f"""
+    if not documentos:
+        response += """
+
+DOCUMENTOS: nenhum"""
+    elif len(documentos) == 1:
+        doc = documentos[0]
+        response += f"""
 
 DOCUMENTO:
-• Número: {doc['numero']}
-• Tipo: {doc['tipo']}
-• Chave: {doc['chave']}
-• Data Emissão: {doc['data_emissao']}"""
-        else:
-            response += f"""
+• Número: {doc.numero}
+• Tipo: {doc.tipo_documento}
+• Chave: {doc.chave}
+• Data Emissão: {doc.data_emissao}"""
+    else:
+        response += f"""
 
 DOCUMENTOS ({len(documentos)}):"""
-            for i, doc in enumerate(documentos, 1):
-                response += f"""
-{i}. Número: {doc['numero']}
-   Tipo: {doc['tipo']}
-   Chave: {doc['chave']}
-   Data Emissão: {doc['data_emissao']}"""
+        for i, doc in enumerate(documentos, 1):
+            response += f"""
+{i}. Número: {doc.numero}
+   Tipo: {doc.tipo_documento}
+   Chave: {doc.chave}
+   Data Emissão: {doc.data_emissao}"""
 
-        return response
+    return response
+
+
+@tool
+@limit_concurrency
+async def get_carga_details(codigos: List[str], owner_id: str) -> str:
+    """Obtém detalhes completos de uma ou mais cargas.
+
+    Args:
+        codigos: Códigos das cargas; passe todos os códigos da pergunta numa
+            única chamada
+        owner_id: ID do proprietário da carga
+
+    Returns:
+        String com detalhes completos das cargas ou mensagem de erro
+    """
+
+    try:
+        logger.debug(
+            "Obtendo detalhes das cargas: %s para owner: %s", codigos, owner_id)
+        results = await db_manager.search_cargas_by_identifiers(codigos, owner_id)
+        for data in results.values():
+            _collect(data[:1])
+
+        if results and compact_output():
+            return _format_compact_results(
+                {codigo: data[:1] for codigo, data in results.items()},
+                DETAIL_FIELDS, "Carga com código '{}' não encontrada")
+
+        return "\n\n".join(
+            _format_carga_details(data[0]) if data
+            else f"Carga com código '{codigo}' não encontrada"
+            for codigo, data in results.items()) or "Nenhum código informado"
 
     except Exception as e:
-        logger.error(f"Erro ao obter detalhes da carga: {e}")
+        logger.error("Erro ao obter detalhes da carga: %s", e)
         return f"Erro ao obter detalhes da carga: {str(e)}"
 
 
 TOOLS = [
     search_carga_by_identifier,
     search_cargas_by_status,
+    count_cargas_by_status,
     list_all_cargas,
     get_carga_details
 ]
@@ -3,8 +3,9 @@ from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from src.config import settings
 from src.db.database import db_manager
-from src.api.routers import main_router, cargas_router, memory_router, health_router
-from src.middleware import global_exception_handler
+from src.ai_agent.ai_agent import ai_agent
+from src.api.routers import main_router, cargas_router, memory_router, health_router, metrics_router
+from src.middleware import global_exception_handler, RequestIdMiddleware
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,9 +16,13 @@ async def lifespan(app: FastAPI):
     logger.info("Iniciando aplicação...")
     try:
         await db_manager.connect()
+        if settings.DB_AUTO_MIGRATE:
+            # Sem as migrações (e os índices delas) a aplicação não deve subir.
+            await db_manager.migrate()
+        await ai_agent.connect()
         logger.info("Aplicação iniciada com sucesso")
     except Exception as e:
-        logger.error(f"Erro ao iniciar aplicação: {e}")
+        logger.error("Erro ao iniciar aplicação: %s", e)
         raise
 
     yield
@@ -25,9 +30,10 @@ async def lifespan(app: FastAPI):
     logger.info("Encerrando aplicação...")
     try:
         await db_manager.disconnect()
+        await ai_agent.disconnect()
         logger.info("Aplicação encerrada com sucesso")
     except Exception as e:
-        logger.error(f"Erro ao encerrar aplicação: {e}")
+        logger.error("Erro ao encerrar aplicação: %s", e)
 
 
 def create_app() -> FastAPI:
@@ -46,9 +52,12 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    app.add_middleware(RequestIdMiddleware)
+
     app.add_exception_handler(Exception, global_exception_handler)
 
     app.include_router(health_router)
+    app.include_router(metrics_router)
     app.include_router(main_router)
     app.include_router(cargas_router)
     app.include_router(memory_router)
@@ -2,5 +2,6 @@ from .ask import router as main_router
 from .cargas import router as cargas_router
 from .memory import router as memory_router
 from .health import router as health_router
+from .metrics import router as metrics_router
 
-__all__ = ["main_router", "cargas_router", "memory_router", "health_router"]
+__all__ = ["main_router", "cargas_router", "memory_router", "health_router", "metrics_router"]
@@ -1,75 +1,208 @@
-from fastapi import APIRouter, HTTPException, Depends
-from src.models.models import AskRequest, AskResponse, CargaInfo
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
+from src.models.models import (
+    AskRequest, AskResponse, CargaInfo,
+    AskBatchRequest, AskBatchItemResult, AskBatchResponse
+)
 from src.ai_agent.ai_agent import ai_agent
+from src.config import settings
 from src.dependencies import check_database_connection
+from typing import Dict, Any, AsyncIterator
+import asyncio
+import json
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Compartilhado por todos os lotes do worker: limita as execuções do agente
+# disparadas pelo /ask/batch, não só as de um mesmo lote.
+batch_semaphore = asyncio.Semaphore(settings.ASK_BATCH_CONCURRENCY)
+
+
+def validate_ask_request(request: AskRequest):
+    if not request.question.strip():
+        raise HTTPException(
+            status_code=400,
+            detail="Pergunta não pode estar vazia"
+        )
+
+    if not request.owner_id.strip():
+        raise HTTPException(
+            status_code=400,
+            detail="owner_id é obrigatório"
+        )
+
+    if not (request.user_id or "").strip():
+        raise HTTPException(
+            status_code=400,
+            detail="user_id é obrigatório"
+        )
+
+
+def build_ask_response(request: AskRequest, result: Dict[str, Any]) -> AskResponse:
+    cargas = []
+    if result.get("raw_data"):
+        for item in result["raw_data"]:
+            carga = CargaInfo(**item)
+            cargas.append(carga)
+
+    return AskResponse(
+        success=True,
+        question=request.question,
+        owner_id=request.owner_id,
+        response=result["response"],
+        data_count=result["data_count"],
+        analysis=result.get("analysis"),
+        cargas=cargas
+    )
+
+
+def format_sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
 
 @router.post("/ask", response_model=AskResponse)
 async def ask(request: AskRequest, _: None = Depends(check_database_connection)):
     try:
-        logger.info(
-            f"Pergunta recebida: '{request.question}' para owner_id: {request.owner_id}")
-
-        if not request.question.strip():
-            raise HTTPException(
-                status_code=400,
-                detail="Pergunta não pode estar vazia"
-            )
-
-        if not request.owner_id.strip():
-            raise HTTPException(
-                status_code=400,
-                detail="owner_id é obrigatório"
-            )
+        logger.info("Pergunta recebida para owner_id: %s", request.owner_id)
 
-        if not request.user_id.strip():
-            raise HTTPException(
-                status_code=400,
-                detail="user_id é obrigatório"
-            )
+        validate_ask_request(request)
 
         result = await ai_agent.process_question(
             request.question.strip(),
             request.owner_id.strip(),
-            request.user_id.strip()
+            request.user_id.strip(),
+            request.idempotency_key
         )
 
         if not result["success"]:
-            logger.error(f"Erro no processamento: {result['response']}")
+            logger.error("Erro no processamento: %s", result['response'])
             raise HTTPException(
-                status_code=500,
+                status_code=409 if result["analysis"].get(
+                    "conversation_busy") else 500,
                 detail=result["response"]
             )
 
-        cargas = []
-        if result.get("raw_data"):
-            for item in result["raw_data"]:
-                carga = CargaInfo(**item)
-                cargas.append(carga)
-
-        response = AskResponse(
-            success=True,
-            question=request.question,
-            owner_id=request.owner_id,
-            response=result["response"],
-            data_count=result["data_count"],
-            analysis=result.get("analysis"),
-            cargas=cargas
-        )
+        response = build_ask_response(request, result)
 
-        logger.info(
-            f"Resposta gerada com {result['data_count']} cargas encontradas")
+        logger.debug(
+            "Resposta gerada com %s cargas encontradas", result['data_count'])
         return response
 
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Erro inesperado no endpoint /ask: {e}")
+        logger.error("Erro inesperado no endpoint /ask: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Erro interno do servidor: {str(e)}"
         )
+
+
+@router.post("/ask/stream")
+async def ask_stream(request: AskRequest, _: None = Depends(check_database_connection)):
+    """Versão em Server-Sent Events do /ask.
+
+    Emite `tool_start`/`tool_end` a cada ferramenta, `token` com trechos da
+    resposta e, ao final, `done` com o mesmo corpo do /ask (ou `error`).
+    """
+    logger.info("Pergunta recebida (stream) para owner_id: %s", request.owner_id)
+
+    validate_ask_request(request)
+
+    async def generate():
+        async for event, data in ai_agent.stream_question(
+                request.question.strip(),
+                request.owner_id.strip(),
+                request.user_id.strip(),
+                request.idempotency_key):
+            if event == "done":
+                data = build_ask_response(request, data).model_dump(mode="json")
+            elif event == "error":
+                data = {"detail": data["response"]}
+            yield format_sse(event, data)
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def _run_batch_item(index: int, request: AskRequest) -> AskBatchItemResult:
+    try:
+        validate_ask_request(request)
+
+        async with batch_semaphore:
+            result = await ai_agent.process_question(
+                request.question.strip(),
+                request.owner_id.strip(),
+                request.user_id.strip(),
+                request.idempotency_key
+            )
+
+        if not result["success"]:
+            return AskBatchItemResult(index=index, success=False, error=result["response"])
+
+        return AskBatchItemResult(
+            index=index, success=True, result=build_ask_response(request, result))
+
+    except HTTPException as e:
+        return AskBatchItemResult(index=index, success=False, error=str(e.detail))
+    except Exception as e:
+        logger.error("Erro no item %s do /ask/batch: %s", index, e)
+        return AskBatchItemResult(index=index, success=False, error=str(e))
+
+
+async def _batch_stream(tasks: list) -> AsyncIterator[str]:
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            item = await next_result
+            yield item.model_dump_json() + "\n"
+    finally:
+        # Cliente desconectou: não há para quem entregar o resto do lote.
+        for task in tasks:
+            task.cancel()
+
+
+@router.post("/ask/batch")
+async def ask_batch(request: AskBatchRequest, stream: bool = Query(False),
+                    _: None = Depends(check_database_connection)):
+    """Processa várias perguntas em paralelo, até ASK_BATCH_CONCURRENCY por vez.
+
+    Falhas ficam isoladas no item. Com `stream=true` cada resultado é enviado
+    em NDJSON assim que termina (fora de ordem; use `index`).
+    """
+    if not request.items:
+        raise HTTPException(
+            status_code=400,
+            detail="Lote sem perguntas"
+        )
+
+    if len(request.items) > settings.ASK_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Lote com mais de {settings.ASK_BATCH_MAX_ITEMS} perguntas"
+        )
+
+    logger.info("Lote recebido com %s perguntas", len(request.items))
+
+    tasks = [asyncio.create_task(_run_batch_item(index, item))
+             for index, item in enumerate(request.items)]
+
+    if stream:
+        return StreamingResponse(
+            _batch_stream(tasks), media_type="application/x-ndjson")
+
+    results = await asyncio.gather(*tasks)
+    succeeded = sum(1 for item in results if item.success)
+
+    logger.info(
+        "Lote concluído: %s sucesso(s), %s falha(s)", succeeded, len(results) - succeeded)
+    return AskBatchResponse(
+        total=len(results),
+        succeeded=succeeded,
+        failed=len(results) - succeeded,
+        results=results
+    )
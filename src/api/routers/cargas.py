@@ -1,26 +1,108 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
+from typing import Optional, List, Dict, Any, AsyncIterator
+from src.config import settings
 from src.db.database import db_manager
+from src.models.models import CargaResult
 from src.dependencies import check_database_connection
+import csv
+import io
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv"
+}
+
+
+CSV_CARGA_FIELDS = [name for name in CargaResult.model_fields
+                    if name not in ("documentos", "nome_owner", "documento_owner", "email_owner")]
+CSV_DOCUMENTO_FIELDS = {
+    "numero": "numero_documento",
+    "chave": "chave_documento",
+    "serie": "serie",
+    "tipo_documento": "tipo_documento",
+    "data_emissao": "data_emissao"
+}
+CSV_FIELDS = CSV_CARGA_FIELDS + list(CSV_DOCUMENTO_FIELDS.values())
+
+
+def _ndjson_chunk(batch: List[CargaResult]) -> str:
+    return "".join(carga.model_dump_json() + "\n" for carga in batch)
+
+
+def _csv_rows(carga: CargaResult) -> List[Dict[str, Any]]:
+    base = carga.model_dump(include=set(CSV_CARGA_FIELDS))
+    if not carga.documentos:
+        return [base]
+    return [
+        {**base, **{CSV_DOCUMENTO_FIELDS[k]: v for k, v in doc.model_dump().items()}}
+        for doc in carga.documentos
+    ]
+
+
+def _csv_chunk(batch: List[CargaResult], write_header: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS)
+    if write_header:
+        writer.writeheader()
+    for carga in batch:
+        writer.writerows(_csv_rows(carga))
+    return buffer.getvalue()
+
+
+async def _export_stream(owner_id: str, format: str) -> AsyncIterator[str]:
+    first = True
+    try:
+        async for batch in db_manager.iter_cargas_by_owner(owner_id, settings.EXPORT_BATCH_SIZE):
+            if format == "csv":
+                yield _csv_chunk(batch, write_header=first)
+            else:
+                yield _ndjson_chunk(batch)
+            first = False
+    except Exception as e:
+        logger.error("Erro durante exportação de cargas: %s", e)
+        raise
+
 
 @router.get("/cargas/{owner_id}", response_model=dict)
-async def list_cargas(owner_id: str, _: None = Depends(check_database_connection)):
+async def list_cargas(owner_id: str, limit: int = Query(50, ge=1, le=500), after: Optional[str] = None,
+                      _: None = Depends(check_database_connection)):
     try:
-        cargas = await db_manager.get_all_cargas_by_owner(owner_id)
+        cargas, next_cursor = await db_manager.get_cargas_page_by_owner(
+            owner_id, limit, after)
+
+        total_cargas = None
+        if after is None:
+            total_cargas = await db_manager.count_cargas_by_owner(owner_id)
 
         return {
             "owner_id": owner_id,
-            "total_cargas": len(cargas),
-            "cargas": cargas
+            "total_cargas": total_cargas,
+            "cargas": cargas,
+            "next_cursor": next_cursor
         }
 
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        logger.error(f"Erro ao listar cargas: {e}")
+        logger.error("Erro ao listar cargas: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Erro ao buscar cargas: {str(e)}"
         )
+
+
+@router.get("/cargas/{owner_id}/export")
+async def export_cargas(owner_id: str, format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+                        _: None = Depends(check_database_connection)):
+    return StreamingResponse(
+        _export_stream(owner_id, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="cargas_{owner_id}.{format}"'
+        }
+    )
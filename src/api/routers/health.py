@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends
 from src.models.models import HealthResponse
 from src.db.database import db_manager
+from src.ai_agent.ai_agent import ai_agent
 from src.dependencies import check_database_connection
 from datetime import datetime
 
@@ -26,3 +27,11 @@ async def health_check():
         database_connected=database_connected,
         timestamp=datetime.now()
     )
+
+
+@router.get("/health/cache", response_model=dict)
+async def cache_stats():
+    return {
+        "queries": db_manager.cache.stats(),
+        "answers": ai_agent.answer_cache.stats() if ai_agent.answer_cache else None
+    }
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from src.ai_agent.ai_agent import ai_agent
 from src.dependencies import check_database_connection
 import logging
@@ -8,16 +8,18 @@ router = APIRouter()
 
 
 @router.get("/memory/{owner_id}", response_model=dict)
-async def get_user_memory(owner_id: str, user_id: str = None, _: None = Depends(check_database_connection)):
+async def get_user_memory(owner_id: str, user_id: str = None, cursor: int = Query(0, ge=0),
+                          limit: int = Query(50, ge=1, le=500), _: None = Depends(check_database_connection)):
     try:
-        memory_info = ai_agent.get_user_memory_info(owner_id, user_id)
+        memory_info = await ai_agent.get_user_memory_info(
+            owner_id, user_id, cursor, limit)
         return {
             "owner_id": owner_id,
             "user_id": user_id,
             "memory_info": memory_info
         }
     except Exception as e:
-        logger.error(f"Erro ao obter memória do usuário: {e}")
+        logger.error("Erro ao obter memória do usuário: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Erro ao obter memória: {str(e)}"
@@ -27,7 +29,7 @@ async def get_user_memory(owner_id: str, user_id: str = None, _: None = Depends(
 @router.delete("/memory/{owner_id}", response_model=dict)
 async def clear_user_memory(owner_id: str, user_id: str = None, _: None = Depends(check_database_connection)):
     try:
-        success = ai_agent.clear_user_memory(owner_id, user_id)
+        success = await ai_agent.clear_user_memory(owner_id, user_id)
         return {
             "owner_id": owner_id,
             "user_id": user_id,
@@ -35,7 +37,7 @@ async def clear_user_memory(owner_id: str, user_id: str = None, _: None = Depend
             "message": "Memória limpa com sucesso" if success else "Usuário não tinha memória"
         }
     except Exception as e:
-        logger.error(f"Erro ao limpar memória do usuário: {e}")
+        logger.error("Erro ao limpar memória do usuário: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Erro ao limpar memória: {str(e)}"
@@ -43,12 +45,13 @@ async def clear_user_memory(owner_id: str, user_id: str = None, _: None = Depend
 
 
 @router.get("/memory", response_model=dict)
-async def get_all_memories(_: None = Depends(check_database_connection)):
+async def get_all_memories(cursor: int = Query(0, ge=0), limit: int = Query(50, ge=1, le=500),
+                           _: None = Depends(check_database_connection)):
     try:
-        memories_info = ai_agent.get_all_memories_info()
+        memories_info = await ai_agent.get_all_memories_info(cursor, limit)
         return memories_info
     except Exception as e:
-        logger.error(f"Erro ao obter informações das memórias: {e}")
+        logger.error("Erro ao obter informações das memórias: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Erro ao obter memórias: {str(e)}"
@@ -58,10 +61,10 @@ async def get_all_memories(_: None = Depends(check_database_connection)):
 @router.get("/redis/info", response_model=dict)
 async def get_redis_info(_: None = Depends(check_database_connection)):
     try:
-        redis_info = ai_agent.get_redis_info()
+        redis_info = await ai_agent.get_redis_info()
         return redis_info
     except Exception as e:
-        logger.error(f"Erro ao obter informações do Redis: {e}")
+        logger.error("Erro ao obter informações do Redis: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Erro ao obter informações do Redis: {str(e)}"
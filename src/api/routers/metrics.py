@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Response
+from prometheus_client import REGISTRY, CONTENT_TYPE_LATEST, generate_latest
+from src.db.database import db_manager
+from src.ai_agent.ai_agent import ai_agent
+from src.metrics import StateCollector
+
+router = APIRouter()
+
+REGISTRY.register(StateCollector(db_manager, ai_agent))
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(generate_latest(REGISTRY), headers={"Content-Type": CONTENT_TYPE_LATEST})
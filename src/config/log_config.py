@@ -0,0 +1,90 @@
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+from contextvars import ContextVar
+from typing import Optional
+
+# Id da requisição HTTP em andamento, preenchido pelo RequestIdMiddleware.
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(request_id)s - %(message)s"
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_configured = False
+
+
+class RequestIdFilter(logging.Filter):
+    """Anexa o id da requisição (ou "-") a cada registro."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get() or "-"
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Um objeto JSON por linha: horário, nível, logger, id da requisição e mensagem."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "timestamp": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler que enfileira o registro sem formatá-lo.
+
+    O prepare() padrão monta a mensagem e o traceback na thread de quem loga e
+    descarta args e exc_info; aqui eles seguem intactos e o formatter do
+    QueueListener resolve tudo. Os args são lidos depois, então não passe
+    objetos que mudam logo após o log.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return copy.copy(record)
+
+
+def configure_logging(level: str, log_format: str = "text", use_queue: bool = True):
+    """Configura o logger raiz uma única vez.
+
+    Com `use_queue` os registros vão para uma fila e são formatados e escritos
+    por uma thread (QueueListener), fora do event loop.
+    """
+    global _listener, _configured
+    if _configured:
+        return
+
+    handler = logging.StreamHandler()
+    if log_format == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    root = logging.getLogger()
+    root.setLevel(getattr(logging, level))
+
+    if use_queue:
+        log_queue = queue.SimpleQueue()
+        queue_handler = DeferredQueueHandler(log_queue)
+        # O filtro roda na thread de quem loga, onde o contextvar da requisição existe.
+        queue_handler.addFilter(RequestIdFilter())
+        root.addHandler(queue_handler)
+
+        _listener = logging.handlers.QueueListener(
+            log_queue, handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+    else:
+        handler.addFilter(RequestIdFilter())
+        root.addHandler(handler)
+
+    _configured = True
@@ -1,6 +1,7 @@
 import os
 import logging
 from dotenv import load_dotenv
+from src.config.log_config import configure_logging
 
 load_dotenv()
 
@@ -11,19 +12,103 @@ class Settings:
 
     # Database settings
     DATABASE_URL = os.getenv("DATABASE_URL")
+    # Migrações no startup de cada worker; em produção rode python -m src.db.migrations no deploy
+    DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "false").lower() == "true"
+    EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 500))
+    # O pool abre DB_POOL_MIN_SIZE conexões no startup, fora do caminho das requisições
+    DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", 5))
+    DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 20))
+    DB_POOL_MAX_IDLE_SECONDS = float(
+        os.getenv("DB_POOL_MAX_IDLE_SECONDS", 300))
+    # Statements preparados por conexão; use 0 atrás do PgBouncer em modo transaction
+    DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 100))
+    DB_COMMAND_TIMEOUT = float(os.getenv("DB_COMMAND_TIMEOUT", 60))
+    DB_QUERY_TIMEOUT = float(os.getenv("DB_QUERY_TIMEOUT", 10))
+    DB_SEARCH_TIMEOUT = float(os.getenv("DB_SEARCH_TIMEOUT", 30))
+    # Cache das leituras por owner, invalidado via LISTEN/NOTIFY
+    DB_CACHE_ENABLED = os.getenv("DB_CACHE_ENABLED", "true").lower() == "true"
+    DB_CACHE_TTL_SECONDS = float(os.getenv("DB_CACHE_TTL_SECONDS", 300))
+    DB_CACHE_MAX_ENTRIES = int(os.getenv("DB_CACHE_MAX_ENTRIES", 5000))
+    DB_CACHE_LISTEN_RETRY_SECONDS = float(
+        os.getenv("DB_CACHE_LISTEN_RETRY_SECONDS", 5))
 
     # Redis settings
     REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+    REDIS_ASYNC = os.getenv("REDIS_ASYNC", "true").lower() == "true"
+    REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 50))
+    REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", 5))
+    REDIS_HEALTH_CHECK_INTERVAL = int(
+        os.getenv("REDIS_HEALTH_CHECK_INTERVAL", 30))
+    # "list": uma entrada por mensagem (RPUSH + LTRIM); "json": blob único via SETEX
+    REDIS_MEMORY_STORAGE = os.getenv("REDIS_MEMORY_STORAGE", "list").lower()
+    REDIS_MEMORY_MAX_MESSAGES = int(
+        os.getenv("REDIS_MEMORY_MAX_MESSAGES", 100))
+    # Limite de tokens do histórico enviado ao LLM (0 desliga; vale junto com a janela)
+    MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", 2000))
+    # Encoding do tiktoken usado para contar os tokens das mensagens
+    MEMORY_TOKEN_ENCODING = os.getenv("MEMORY_TOKEN_ENCODING", "cl100k_base")
+    # Resumo em segundo plano das mensagens que saem da janela (só storage "list")
+    MEMORY_SUMMARY_ENABLED = os.getenv(
+        "MEMORY_SUMMARY_ENABLED", "false").lower() == "true"
+    # Mensagens na lista a partir das quais as mais antigas que a janela são resumidas
+    MEMORY_SUMMARY_THRESHOLD = int(os.getenv("MEMORY_SUMMARY_THRESHOLD", 30))
+    MEMORY_SUMMARY_MAX_WORDS = int(os.getenv("MEMORY_SUMMARY_MAX_WORDS", 150))
+
+    # LLM do agente: "openai" ou "fake" (local e determinístico, para testes de carga)
+    LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openai").lower()
+    LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o-mini")
+    LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", 0.1))
+    # Espera simulada por chamada do LLM fake
+    FAKE_LLM_LATENCY_SECONDS = float(os.getenv("FAKE_LLM_LATENCY_SECONDS", 0.5))
+
+    # Responde perguntas diretas (código, chave, status) sem passar pelo LLM
+    INTENT_ROUTER_ENABLED = os.getenv(
+        "INTENT_ROUTER_ENABLED", "true").lower() == "true"
+
+    # /ask/batch: perguntas processadas ao mesmo tempo (por worker, somando todos
+    # os lotes); mantenha abaixo de DB_POOL_MAX_SIZE e do rate limit do LLM
+    ASK_BATCH_CONCURRENCY = int(os.getenv("ASK_BATCH_CONCURRENCY", 5))
+    ASK_BATCH_MAX_ITEMS = int(os.getenv("ASK_BATCH_MAX_ITEMS", 500))
+    # Chamadas de ferramenta de um mesmo turno executadas ao mesmo tempo;
+    # cada uma usa uma conexão do pool, por padrão um quarto dele
+    TOOL_CONCURRENCY = int(os.getenv(
+        "TOOL_CONCURRENCY", max(1, DB_POOL_MAX_SIZE // 4)))
+    # Saída das ferramentas para o LLM: "text" (blocos descritivos) ou
+    # "compact" (TSV sem campos vazios, com menos tokens no prompt e na memória)
+    TOOL_OUTPUT_FORMAT = os.getenv("TOOL_OUTPUT_FORMAT", "text").lower()
+    # Colunas das listagens no formato compacto, entre: codigo, status, pedido,
+    # remetente, origem, endereco_remetente, destinatario, destino,
+    # endereco_destinatario, criacao, documentos
+    TOOL_OUTPUT_FIELDS = os.getenv(
+        "TOOL_OUTPUT_FIELDS", "codigo,status,pedido,remetente,destino")
+
+    # Um turno por conversa de cada vez (lock no Redis, em segundos)
+    CONVERSATION_LOCK_TIMEOUT = float(
+        os.getenv("CONVERSATION_LOCK_TIMEOUT", 120))
+    CONVERSATION_LOCK_WAIT = float(os.getenv("CONVERSATION_LOCK_WAIT", 60))
+    # Reenvio com o mesmo idempotency_key nesse intervalo devolve o resultado já calculado (0 desliga)
+    DUPLICATE_TURN_WINDOW_SECONDS = int(
+        os.getenv("DUPLICATE_TURN_WINDOW_SECONDS", 10))
+
+    # Cache de respostas do /ask (Redis), invalidado por mudanças nas cargas do owner
+    ANSWER_CACHE_ENABLED = os.getenv(
+        "ANSWER_CACHE_ENABLED", "false").lower() == "true"
+    ANSWER_CACHE_TTL_SECONDS = int(os.getenv("ANSWER_CACHE_TTL_SECONDS", 600))
 
     # Logging configuration
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    # "text" ou "json" (um objeto por linha, com o id da requisição)
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+    # Escreve os logs numa thread separada (QueueHandler/QueueListener)
+    LOG_QUEUE = os.getenv("LOG_QUEUE", "true").lower() == "true"
+    # verbose=True do AgentExecutor: imprime cada passo do agente no stdout
+    AGENT_VERBOSE = os.getenv("AGENT_VERBOSE", "false").lower() == "true"
+    # Fração das perguntas com os passos do agente registrados em DEBUG
+    AGENT_TRACE_SAMPLE_RATE = float(os.getenv("AGENT_TRACE_SAMPLE_RATE", 0.1))
 
     @staticmethod
     def setup_logging():
-        logging.basicConfig(
-            level=getattr(logging, Settings.LOG_LEVEL),
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
+        configure_logging(Settings.LOG_LEVEL, Settings.LOG_FORMAT, Settings.LOG_QUEUE)
         return logging.getLogger(__name__)
 
 
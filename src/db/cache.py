@@ -0,0 +1,143 @@
+import functools
+import inspect
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Set, Tuple
+
+CARGAS_CHANGED_CHANNEL = "cargas_changed"
+
+
+class QueryCache:
+    """Cache LRU com TTL para leituras do DatabaseManager, separado por owner.
+
+    As entradas de um owner são descartadas quando o banco notifica mudança
+    nas cargas dele (ver migração cargas_change_notify). Enquanto a escuta
+    não estiver ativa, o cache fica desligado.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.active = False
+        self._entries: "OrderedDict[Hashable, Tuple[float, str, Any]]" = OrderedDict()
+        self._owner_keys: Dict[str, Set[Hashable]] = {}
+        self._owner_generations: Dict[str, int] = {}
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def generation(self, owner_id: str) -> Tuple[int, int]:
+        return self._epoch, self._owner_generations.get(owner_id, 0)
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return False, None
+
+        expires_at, owner_id, value = entry
+        if expires_at <= time.monotonic():
+            self._remove(key, owner_id)
+            self.misses += 1
+            return False, None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return True, value
+
+    def set(self, owner_id: str, key: Hashable, value: Any, generation: Tuple[int, int]):
+        # Uma invalidação chegou durante a consulta: o resultado pode ser antigo.
+        if not self.active or generation != self.generation(owner_id):
+            return
+
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, owner_id, value)
+        self._entries.move_to_end(key)
+        self._owner_keys.setdefault(owner_id, set()).add(key)
+
+        while len(self._entries) > self.max_entries:
+            old_key, (_, old_owner, _) = next(iter(self._entries.items()))
+            self._remove(old_key, old_owner)
+            self.evictions += 1
+
+    def invalidate_owner(self, owner_id: str):
+        if len(self._owner_generations) >= self.max_entries:
+            # Zerar as gerações só é seguro mudando a época; senão uma consulta
+            # em andamento veria a mesma geração de antes da invalidação.
+            self._epoch += 1
+            self._owner_generations.clear()
+        self._owner_generations[owner_id] = self._owner_generations.get(owner_id, 0) + 1
+        for key in self._owner_keys.pop(owner_id, set()):
+            self._entries.pop(key, None)
+        self.invalidations += 1
+
+    def clear(self):
+        self._epoch += 1
+        self._entries.clear()
+        self._owner_keys.clear()
+        self._owner_generations.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "active": self.active,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+    def _remove(self, key: Hashable, owner_id: str):
+        self._entries.pop(key, None)
+        keys = self._owner_keys.get(owner_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._owner_keys[owner_id]
+
+
+def _normalize_arg(value: Any) -> Hashable:
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, list):
+        return tuple(value)
+    return value
+
+
+def cached_read(method):
+    """Guarda no `self.cache` o resultado de um método de leitura com `owner_id`.
+
+    A chave é (owner_id, nome do método, argumentos normalizados).
+    """
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        cache: QueryCache = self.cache
+        if not cache.active:
+            return await method(self, *args, **kwargs)
+
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        arguments = dict(bound.arguments)
+        arguments.pop("self")
+        owner_id = str(arguments.pop("owner_id")).strip().lower()
+
+        key = (owner_id, method.__name__, tuple(
+            (name, _normalize_arg(value)) for name, value in arguments.items()))
+
+        found, value = cache.get(key)
+        if found:
+            return value
+
+        generation = cache.generation(owner_id)
+        value = await method(self, *args, **kwargs)
+        cache.set(owner_id, key, value, generation)
+        return value
+
+    return wrapper
@@ -1,14 +1,208 @@
 import os
+import asyncio
 import asyncpg
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple, AsyncIterator, Callable, Set
 import logging
 from dotenv import load_dotenv
 import re
+import json
+import base64
+import uuid
+from datetime import datetime
+from src.config import settings
+from src.db.cache import QueryCache, cached_read, CARGAS_CHANGED_CHANNEL
+from src.db.migrations import apply_migrations
+from src.metrics import DB_QUERY_SECONDS
+from src.models.models import CargaResult
 
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+CHAVE_DOCUMENTO_PATTERN = re.compile(r"^\d{44}$")
+CHAVE_SEPARATORS_PATTERN = re.compile(r"[\s.\-/]")
+
+# Uma linha por carga: os documentos vêm agregados em JSON pelo LATERAL,
+# sem multiplicar as colunas da carga nem exigir DISTINCT.
+CARGA_COLUMNS = """
+        oc.id::text as oferta_id,
+        oc.codigo,
+        oc.nome_empresa_remetente,
+        oc.endereco_remetente,
+        oc.cidade_remetente,
+        oc.estado_remetente,
+        oc.nome_empresa_destinatario,
+        oc.endereco_destinatario,
+        oc.cidade_destinatario,
+        oc.estado_destinatario,
+        oc.status,
+        oc.pedido_embarcador,
+        oc.data_criacao as data_criacao_carga,
+        COALESCE(docs.documentos, '[]'::json) as documentos"""
+
+DOCUMENTOS_LATERAL = """
+    LEFT JOIN LATERAL (
+        SELECT json_agg(json_build_object(
+            'numero', cd.numero,
+            'chave', cd.chave,
+            'serie', cd.serie,
+            'tipo_documento', cd.tipo_documento,
+            'data_emissao', cd.data_emissao
+        ) ORDER BY cd.data_emissao, cd.numero) as documentos
+        FROM carga_documento cd
+        WHERE cd.oferta_carga_id = oc.id
+    ) docs ON true"""
+
+SEARCH_CARGA_QUERY = f"""
+    SELECT{CARGA_COLUMNS},
+        o.nome as nome_owner,
+        o.documento as documento_owner,
+        o.email as email_owner
+    FROM oferta_carga oc
+    LEFT JOIN owners o ON oc.owner_id = o.id{DOCUMENTOS_LATERAL}
+    WHERE oc.owner_id = $1
+    AND {{condition}}
+    ORDER BY oc.data_criacao DESC{{limit}}
+"""
+
+# Chave da paginação keyset, atendida pelo índice idx_oferta_carga_owner_keyset.
+# data_criacao é anulável: as cargas sem data ficam no fim como '-infinity'
+# (datetime.min no asyncpg), o mesmo valor gravado no cursor.
+CARGA_KEYSET_ORDER = "COALESCE(oc.data_criacao, '-infinity'::timestamptz)"
+
+# Primeira página e páginas seguintes em consultas separadas: com um
+# "$2 IS NULL OR ..." o plano genérico do statement preparado não usaria o
+# cursor como limite do range no índice. Com LIMIT NULL percorre tudo.
+CARGAS_FIRST_PAGE_BY_OWNER_QUERY = f"""
+    SELECT{CARGA_COLUMNS}
+    FROM oferta_carga oc{DOCUMENTOS_LATERAL}
+    WHERE oc.owner_id = $1
+    ORDER BY {CARGA_KEYSET_ORDER} DESC, oc.id DESC
+    LIMIT $2
+"""
+
+CARGAS_PAGE_AFTER_BY_OWNER_QUERY = f"""
+    SELECT{CARGA_COLUMNS}
+    FROM oferta_carga oc{DOCUMENTOS_LATERAL}
+    WHERE oc.owner_id = $1
+    AND ({CARGA_KEYSET_ORDER}, oc.id) < ($2::timestamptz, $3::uuid)
+    ORDER BY {CARGA_KEYSET_ORDER} DESC, oc.id DESC
+    LIMIT $4
+"""
+
+COUNT_CARGAS_BY_OWNER_QUERY = """
+    SELECT COUNT(*) FROM oferta_carga WHERE owner_id = $1
+"""
+
+# O LIMIT fica na subconsulta para que os documentos só sejam agregados para
+# as cargas retornadas, não para todas as cargas com o status.
+CARGAS_BY_STATUS_QUERY = f"""
+    SELECT{CARGA_COLUMNS}
+    FROM (
+        SELECT *
+        FROM oferta_carga
+        WHERE owner_id = $1
+        AND UPPER(status) = UPPER($2)
+        ORDER BY data_criacao DESC
+        LIMIT $3
+    ) oc{DOCUMENTOS_LATERAL}
+    ORDER BY oc.data_criacao DESC
+"""
+
+COUNT_CARGAS_BY_STATUS_QUERY = """
+    SELECT COUNT(*) FROM oferta_carga WHERE owner_id = $1 AND UPPER(status) = UPPER($2)
+"""
+
+# As colunas de janela são calculadas antes do LIMIT: total_cargas e
+# total_grupos consideram todos os grupos, não só os retornados.
+STATUS_SUMMARY_QUERY = """
+    SELECT status, COUNT(*) as total,
+        SUM(COUNT(*)) OVER ()::bigint as total_cargas,
+        COUNT(*) OVER () as total_grupos
+    FROM oferta_carga
+    WHERE owner_id = $1
+    AND ($2::text IS NULL OR UPPER(status) = UPPER($2))
+    GROUP BY status
+    ORDER BY total DESC, status
+    LIMIT $3
+"""
+
+STATUS_ESTADO_SUMMARY_QUERY = """
+    SELECT status, estado_destinatario, COUNT(*) as total,
+        SUM(COUNT(*)) OVER ()::bigint as total_cargas,
+        COUNT(*) OVER () as total_grupos
+    FROM oferta_carga
+    WHERE owner_id = $1
+    AND ($2::text IS NULL OR UPPER(status) = UPPER($2))
+    GROUP BY status, estado_destinatario
+    ORDER BY total DESC, status, estado_destinatario
+    LIMIT $3
+"""
+
+# Cada coluna é filtrada em um SELECT próprio para que o planner use o índice
+# trigram (ou de prefixo) de cada uma e combine os ids; um OR sobre o JOIN
+# com carga_documento forçaria uma varredura sequencial.
+IDENTIFIER_LIKE_CONDITION = """oc.id IN (
+            SELECT id FROM oferta_carga
+            WHERE owner_id = $1 AND UPPER(codigo) LIKE $2
+            UNION
+            SELECT id FROM oferta_carga
+            WHERE owner_id = $1 AND UPPER(pedido_embarcador) LIKE $2
+            UNION
+            SELECT cd.oferta_carga_id FROM carga_documento cd
+            JOIN oferta_carga doc_oc ON doc_oc.id = cd.oferta_carga_id
+            WHERE doc_oc.owner_id = $1 AND UPPER(cd.numero) LIKE $2
+            UNION
+            SELECT cd.oferta_carga_id FROM carga_documento cd
+            JOIN oferta_carga doc_oc ON doc_oc.id = cd.oferta_carga_id
+            WHERE doc_oc.owner_id = $1 AND UPPER(cd.chave) LIKE $2
+        )"""
+
+IDENTIFIER_CHAVE_CONDITION = """oc.id IN (
+            SELECT oferta_carga_id FROM carga_documento WHERE chave = $2
+        )"""
+
+IDENTIFIER_CODIGO_CONDITION = "oc.codigo = ANY($2::text[])"
+
+# Máximo de cargas por busca aproximada (chave, prefixo, substring); a busca
+# por códigos exatos não tem limite, já que devolve uma carga por código.
+IDENTIFIER_MATCH_LIMIT = 20
+# Tamanho mínimo para a busca por substring, que depende dos índices trigram.
+TRIGRAM_MIN_LENGTH = 3
+
+IDENTIFIER_TIER_CONDITIONS = {
+    "chave": IDENTIFIER_CHAVE_CONDITION,
+    "codigo": IDENTIFIER_CODIGO_CONDITION,
+    "prefixo": IDENTIFIER_LIKE_CONDITION,
+    "substring": IDENTIFIER_LIKE_CONDITION,
+}
+
+# Registro das consultas do DatabaseManager, referenciadas pelo nome. O texto
+# de cada uma é fixo, então o cache de statements do asyncpg prepara a consulta
+# uma vez por conexão e a reaproveita entre acquires (um PreparedStatement
+# explícito é invalidado quando a conexão volta ao pool). init_connection
+# prepara todas antes da conexão entrar no pool.
+QUERIES: Dict[str, str] = {
+    "cargas_first_page_by_owner": CARGAS_FIRST_PAGE_BY_OWNER_QUERY,
+    "cargas_page_after_by_owner": CARGAS_PAGE_AFTER_BY_OWNER_QUERY,
+    "count_cargas_by_owner": COUNT_CARGAS_BY_OWNER_QUERY,
+    "cargas_by_status": CARGAS_BY_STATUS_QUERY,
+    "count_cargas_by_status": COUNT_CARGAS_BY_STATUS_QUERY,
+    "status_summary": STATUS_SUMMARY_QUERY,
+    "status_estado_summary": STATUS_ESTADO_SUMMARY_QUERY,
+    **{
+        f"identifier_{tier}": SEARCH_CARGA_QUERY.format(
+            condition=condition,
+            limit="" if tier == "codigo" else f"\n    LIMIT {IDENTIFIER_MATCH_LIMIT}")
+        for tier, condition in IDENTIFIER_TIER_CONDITIONS.items()
+    },
+}
+
+# Timeouts (segundos) que diferem de settings.DB_QUERY_TIMEOUT.
+QUERY_TIMEOUTS: Dict[str, float] = {
+    "identifier_substring": settings.DB_SEARCH_TIMEOUT,
+}
+
 
 def convert_jdbc_to_postgresql_url(jdbc_url: str) -> str:
     if jdbc_url.startswith('jdbc:postgresql://'):
@@ -16,9 +210,88 @@ def convert_jdbc_to_postgresql_url(jdbc_url: str) -> str:
     return jdbc_url
 
 
+def encode_cursor(data_criacao: Optional[datetime], oferta_id: str) -> str:
+    # Mesmo COALESCE de CARGA_KEYSET_ORDER: sem data, a carga vale '-infinity'.
+    raw = f"{(data_criacao or datetime.min).isoformat()}|{oferta_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data_criacao, oferta_id = base64.urlsafe_b64decode(
+            padded).decode().split("|", 1)
+        return datetime.fromisoformat(data_criacao), uuid.UUID(oferta_id)
+    except Exception:
+        raise ValueError(f"Cursor inválido: {cursor}")
+
+
+async def init_connection(connection: asyncpg.Connection):
+    await connection.set_type_codec(
+        "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+    # Depois do codec: set_type_codec descarta o cache de statements.
+    if settings.DB_STATEMENT_CACHE_SIZE > 0:
+        await warm_statement_cache(connection)
+
+
+async def warm_statement_cache(connection: asyncpg.Connection):
+    """Prepara as consultas de QUERIES no cache de statements da conexão.
+
+    connection.prepare() não passa pelo cache (devolve um PreparedStatement
+    avulso), por isso o preparo usa o mesmo caminho de fetch/fetchval. Uma
+    falha (ex.: banco ainda sem as migrações) só adia o preparo para o
+    primeiro uso da consulta.
+    """
+    for name, sql in QUERIES.items():
+        try:
+            await connection._get_statement(sql, None)
+        except Exception as e:
+            logger.warning(
+                "Não foi possível preparar a consulta %s na nova conexão: %s", name, e)
+            return
+
+
+def escape_like(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def identifier_lookup_tiers(identifier: str) -> List[Tuple[str, str, Any]]:
+    """Monta as etapas de busca por identificador, da mais barata para a mais cara.
+
+    Cada etapa é (nome, condição SQL, parâmetro $2). A busca para na primeira
+    etapa que retornar linhas; o LIKE com curinga no início só roda por último
+    e só para identificadores com ao menos TRIGRAM_MIN_LENGTH caracteres.
+    """
+    tiers = []
+
+    chave = CHAVE_SEPARATORS_PATTERN.sub('', identifier)
+    if CHAVE_DOCUMENTO_PATTERN.match(chave):
+        identifier = chave
+        tiers.append(("chave", IDENTIFIER_CHAVE_CONDITION, chave))
+    else:
+        codigos = list(dict.fromkeys([identifier, identifier.upper()]))
+        tiers.append(("codigo", IDENTIFIER_CODIGO_CONDITION, codigos))
+
+    tiers.append(("prefixo", IDENTIFIER_LIKE_CONDITION,
+                  f"{escape_like(identifier.upper())}%"))
+
+    if len(identifier) >= TRIGRAM_MIN_LENGTH:
+        tiers.append(("substring", IDENTIFIER_LIKE_CONDITION,
+                      f"%{escape_like(identifier.upper())}%"))
+
+    return tiers
+
+
 class DatabaseManager:
     def __init__(self):
         self.pool: Optional[asyncpg.Pool] = None
+        self.cache = QueryCache(
+            settings.DB_CACHE_MAX_ENTRIES, settings.DB_CACHE_TTL_SECONDS)
+        self._database_url: Optional[str] = None
+        self._listener: Optional[asyncpg.Connection] = None
+        self._listener_task: Optional[asyncio.Task] = None
+        self._change_callbacks: List[Callable[[str], Any]] = []
+        self._callback_tasks: Set[asyncio.Task] = set()
 
     async def connect(self):
         try:
@@ -28,140 +301,275 @@ class DatabaseManager:
             )
 
             DATABASE_URL = convert_jdbc_to_postgresql_url(DATABASE_URL)
-            logger.info(f"Conectando ao banco com URL: {DATABASE_URL}")
+            self._database_url = DATABASE_URL
+            logger.info("Conectando ao banco com URL: %s", DATABASE_URL)
 
             self.pool = await asyncpg.create_pool(
                 DATABASE_URL,
-                min_size=1,
-                max_size=10,
-                command_timeout=60
+                min_size=settings.DB_POOL_MIN_SIZE,
+                max_size=settings.DB_POOL_MAX_SIZE,
+                max_inactive_connection_lifetime=settings.DB_POOL_MAX_IDLE_SECONDS,
+                statement_cache_size=settings.DB_STATEMENT_CACHE_SIZE,
+                command_timeout=settings.DB_COMMAND_TIMEOUT,
+                init=init_connection
             )
-            logger.info("Conexão com banco PostgreSQL estabelecida")
+            logger.info(
+                "Conexão com banco PostgreSQL estabelecida (pool %s-%s)",
+                settings.DB_POOL_MIN_SIZE, settings.DB_POOL_MAX_SIZE)
+
+            if settings.DB_CACHE_ENABLED or settings.ANSWER_CACHE_ENABLED:
+                if not await self._start_listener():
+                    self._schedule_listener_reconnect()
 
         except Exception as e:
-            logger.error(f"Erro ao conectar com o banco: {e}")
+            logger.error("Erro ao conectar com o banco: %s", e)
             raise
 
+    async def migrate(self) -> List[int]:
+        if not self.pool:
+            raise Exception("Banco não conectado")
+
+        async with self.pool.acquire() as connection:
+            return await apply_migrations(connection)
+
     async def disconnect(self):
+        await self._stop_listener()
         if self.pool:
             await self.pool.close()
             logger.info("Conexão com banco fechada")
 
-    async def search_carga_by_identifier(self, identifier: str, owner_id: str) -> List[Dict[str, Any]]:
-        if not self.pool:
-            raise Exception("Banco não conectado")
+    async def _start_listener(self) -> bool:
+        """Abre a conexão dedicada ao LISTEN que mantém os caches válidos.
+
+        Fica fora do pool porque o reset das conexões do pool faz UNLISTEN.
+        """
+        try:
+            listener = await asyncpg.connect(self._database_url)
+            await listener.add_listener(CARGAS_CHANGED_CHANNEL, self._on_cargas_changed)
+            listener.add_termination_listener(self._on_listener_closed)
+        except Exception as e:
+            logger.error("Erro ao escutar %s, cache de consultas desativado: %s", CARGAS_CHANGED_CHANNEL, e)
+            return False
+
+        self._listener = listener
+        self.cache.active = settings.DB_CACHE_ENABLED
+        logger.info("Escutando mudanças de cargas (LISTEN %s)", CARGAS_CHANGED_CHANNEL)
+        return True
+
+    @property
+    def notifications_active(self) -> bool:
+        return self._listener is not None
+
+    def add_change_listener(self, callback: Callable[[str], Any]):
+        """Registra `callback(owner_id)` para cada mudança nas cargas ("*" = todos os owners).
 
-        query = """
-        SELECT DISTINCT
-            oc.id::text as oferta_id,
-            oc.codigo,
-            oc.nome_empresa_remetente,
-            oc.endereco_remetente,
-            oc.cidade_remetente,
-            oc.estado_remetente,
-            oc.nome_empresa_destinatario,
-            oc.endereco_destinatario,
-            oc.cidade_destinatario,
-            oc.estado_destinatario,
-            oc.status,
-            oc.pedido_embarcador,
-            oc.data_criacao as data_criacao_carga,
-            cd.numero as numero_documento,
-            cd.chave as chave_documento,
-            cd.serie,
-            cd.tipo_documento,
-            cd.data_emissao,
-            o.nome as nome_owner,
-            o.documento as documento_owner,
-            o.email as email_owner
-        FROM oferta_carga oc
-        LEFT JOIN carga_documento cd ON oc.id = cd.oferta_carga_id
-        LEFT JOIN owners o ON oc.owner_id = o.id
-        WHERE oc.owner_id = $1
-        AND (
-            UPPER(oc.codigo) LIKE UPPER($2) OR
-            UPPER(oc.pedido_embarcador) LIKE UPPER($2) OR
-            UPPER(cd.numero) LIKE UPPER($2) OR
-            UPPER(cd.chave) LIKE UPPER($2)
-        )
-        ORDER BY oc.data_criacao DESC
+        Corrotinas são agendadas como tasks.
         """
+        self._change_callbacks.append(callback)
+
+    async def _stop_listener(self):
+        self.cache.active = False
+        self.cache.clear()
+
+        if self._listener_task:
+            self._listener_task.cancel()
+            self._listener_task = None
+
+        listener, self._listener = self._listener, None
+        if listener and not listener.is_closed():
+            listener.remove_termination_listener(self._on_listener_closed)
+            await listener.close()
+
+    async def _reconnect_listener(self):
+        while self.pool is not None:
+            await asyncio.sleep(settings.DB_CACHE_LISTEN_RETRY_SECONDS)
+            if await self._start_listener():
+                break
+        self._listener_task = None
+
+    def _schedule_listener_reconnect(self):
+        if self.pool is not None and self._listener_task is None:
+            self._listener_task = asyncio.create_task(self._reconnect_listener())
+
+    def _on_cargas_changed(self, connection, pid, channel, payload):
+        if payload == "*":
+            self.cache.clear()
+        else:
+            self.cache.invalidate_owner(payload)
+
+        for callback in self._change_callbacks:
+            result = callback(payload)
+            if asyncio.iscoroutine(result):
+                # O loop só guarda referência fraca às tasks; sem esta, elas
+                # podem ser coletadas antes de rodar.
+                task = asyncio.create_task(result)
+                self._callback_tasks.add(task)
+                task.add_done_callback(self._callback_tasks.discard)
+
+    def _on_listener_closed(self, connection):
+        # Sem a escuta, notificações podem se perder: descarta tudo e
+        # desliga o cache até reconectar.
+        logger.warning("Conexão de LISTEN %s perdida", CARGAS_CHANGED_CHANNEL)
+        self.cache.active = False
+        self.cache.clear()
+        self._listener = None
+        self._schedule_listener_reconnect()
+
+    async def _fetch(self, connection: asyncpg.Connection, name: str, *args) -> List[asyncpg.Record]:
+        timeout = QUERY_TIMEOUTS.get(name, settings.DB_QUERY_TIMEOUT)
+        with DB_QUERY_SECONDS.labels(name).time():
+            return await connection.fetch(QUERIES[name], *args, timeout=timeout)
 
-        search_pattern = f"%{identifier}%"
+    async def _fetchval(self, connection: asyncpg.Connection, name: str, *args) -> Any:
+        timeout = QUERY_TIMEOUTS.get(name, settings.DB_QUERY_TIMEOUT)
+        with DB_QUERY_SECONDS.labels(name).time():
+            return await connection.fetchval(QUERIES[name], *args, timeout=timeout)
 
+    async def _lookup_identifier(self, connection: asyncpg.Connection, identifier: str,
+                                 owner_id: str, skip_codigo: bool = False) -> List[CargaResult]:
+        for tier, _, param in identifier_lookup_tiers(identifier):
+            if skip_codigo and tier == "codigo":
+                continue
+            rows = await self._fetch(
+                connection, f"identifier_{tier}", owner_id, param)
+            if rows:
+                logger.debug(
+                    "Identificador '%s' encontrado na etapa '%s'", identifier, tier)
+                return [CargaResult(**row) for row in rows]
+
+        return []
+
+    @cached_read
+    async def search_cargas_by_identifiers(self, identifiers: List[str],
+                                           owner_id: str) -> Dict[str, List[CargaResult]]:
+        """Busca vários identificadores de uma vez, retornando as cargas de cada um.
+
+        Os códigos exatos saem numa única consulta (codigo = ANY($2)); só os
+        identificadores sem código correspondente passam pelas demais etapas
+        de identifier_lookup_tiers, na mesma conexão.
+        """
+        if not self.pool:
+            raise Exception("Banco não conectado")
+
+        identifiers = list(dict.fromkeys(
+            identifier.strip() for identifier in identifiers if identifier.strip()))
+        codigos_by_identifier: Dict[str, List[str]] = {}
+        for identifier in identifiers:
+            tier, _, param = identifier_lookup_tiers(identifier)[0]
+            if tier == "codigo":
+                codigos_by_identifier[identifier] = param
+        codigos = list(dict.fromkeys(
+            codigo for values in codigos_by_identifier.values() for codigo in values))
+
+        results: Dict[str, List[CargaResult]] = {}
         async with self.pool.acquire() as connection:
-            rows = await connection.fetch(query, owner_id, search_pattern)
+            by_codigo: Dict[str, List[CargaResult]] = {}
+            if codigos:
+                for row in await self._fetch(connection, "identifier_codigo", owner_id, codigos):
+                    by_codigo.setdefault(row["codigo"], []).append(CargaResult(**row))
 
-        return [dict(row) for row in rows]
+            for identifier in identifiers:
+                data = [carga for codigo in codigos_by_identifier.get(identifier, [])
+                        for carga in by_codigo.get(codigo, [])]
+                if not data:
+                    data = await self._lookup_identifier(
+                        connection, identifier, owner_id,
+                        skip_codigo=identifier in codigos_by_identifier)
+                results[identifier] = data
 
-    async def get_all_cargas_by_owner(self, owner_id: str) -> List[Dict[str, Any]]:
+        return results
+
+    @cached_read
+    async def get_cargas_page_by_owner(self, owner_id: str, limit: int = 50,
+                                       after: Optional[str] = None) -> Tuple[List[CargaResult], Optional[str]]:
+        """Retorna uma página de cargas do owner e o cursor da próxima página.
+
+        `after` é o cursor devolvido pela página anterior.
+        """
         if not self.pool:
             raise Exception("Banco não conectado")
 
-        query = """
-        SELECT DISTINCT
-            oc.id::text as oferta_id,
-            oc.codigo,
-            oc.nome_empresa_remetente,
-            oc.endereco_remetente,
-            oc.cidade_remetente,
-            oc.estado_remetente,
-            oc.nome_empresa_destinatario,
-            oc.endereco_destinatario,
-            oc.cidade_destinatario,
-            oc.estado_destinatario,
-            oc.status,
-            oc.pedido_embarcador,
-            oc.data_criacao as data_criacao_carga,
-            cd.numero as numero_documento,
-            cd.chave as chave_documento,
-            cd.serie,
-            cd.tipo_documento,
-            cd.data_emissao
-        FROM oferta_carga oc
-        LEFT JOIN carga_documento cd ON oc.id = cd.oferta_carga_id
-        WHERE oc.owner_id = $1
-        ORDER BY oc.data_criacao DESC
+        async with self.pool.acquire() as connection:
+            if after:
+                after_data_criacao, after_id = decode_cursor(after)
+                rows = await self._fetch(
+                    connection, "cargas_page_after_by_owner", owner_id, after_data_criacao, after_id, limit + 1)
+            else:
+                rows = await self._fetch(
+                    connection, "cargas_first_page_by_owner", owner_id, limit + 1)
+
+        data = [CargaResult(**row) for row in rows[:limit]]
+
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = encode_cursor(
+                data[-1].data_criacao_carga, data[-1].oferta_id)
+
+        return data, next_cursor
+
+    async def iter_cargas_by_owner(self, owner_id: str, batch_size: int = 500) -> AsyncIterator[List[CargaResult]]:
+        """Percorre todas as cargas do owner com um cursor no servidor, em lotes.
+
+        Usa a consulta da primeira página com LIMIT NULL; só `batch_size`
+        linhas ficam em memória por vez.
         """
+        if not self.pool:
+            raise Exception("Banco não conectado")
 
         async with self.pool.acquire() as connection:
-            rows = await connection.fetch(query, owner_id)
+            async with connection.transaction(readonly=True):
+                batch = []
+                async for row in connection.cursor(
+                        QUERIES["cargas_first_page_by_owner"], owner_id, None, prefetch=batch_size):
+                    batch.append(CargaResult(**row))
+                    if len(batch) >= batch_size:
+                        yield batch
+                        batch = []
+                if batch:
+                    yield batch
 
-        return [dict(row) for row in rows]
+    @cached_read
+    async def count_cargas_by_owner(self, owner_id: str) -> int:
+        if not self.pool:
+            raise Exception("Banco não conectado")
+
+        async with self.pool.acquire() as connection:
+            return await self._fetchval(connection, "count_cargas_by_owner", owner_id)
 
-    async def search_cargas_by_status(self, status: str, owner_id: str) -> List[Dict[str, Any]]:
+    @cached_read
+    async def search_cargas_by_status(self, status: str, owner_id: str, limit: Optional[int] = None) -> List[CargaResult]:
         if not self.pool:
             raise Exception("Banco não conectado")
 
-        query = """
-        SELECT DISTINCT
-            oc.id::text as oferta_id,
-            oc.codigo,
-            oc.nome_empresa_remetente,
-            oc.endereco_remetente,
-            oc.cidade_remetente,
-            oc.estado_remetente,
-            oc.nome_empresa_destinatario,
-            oc.endereco_destinatario,
-            oc.cidade_destinatario,
-            oc.estado_destinatario,
-            oc.status,
-            oc.pedido_embarcador,
-            oc.data_criacao as data_criacao_carga,
-            cd.numero as numero_documento,
-            cd.chave as chave_documento,
-            cd.serie,
-            cd.tipo_documento,
-            cd.data_emissao
-        FROM oferta_carga oc
-        LEFT JOIN carga_documento cd ON oc.id = cd.oferta_carga_id
-        WHERE oc.owner_id = $1
-        AND UPPER(oc.status) = UPPER($2)
-        ORDER BY oc.data_criacao DESC
+        async with self.pool.acquire() as connection:
+            rows = await self._fetch(connection, "cargas_by_status", owner_id, status, limit)
+
+        return [CargaResult(**row) for row in rows]
+
+    @cached_read
+    async def count_cargas_by_status(self, status: str, owner_id: str) -> int:
+        if not self.pool:
+            raise Exception("Banco não conectado")
+
+        async with self.pool.acquire() as connection:
+            return await self._fetchval(connection, "count_cargas_by_status", owner_id, status)
+
+    @cached_read
+    async def get_status_summary(self, owner_id: str, status: Optional[str] = None,
+                                 by_estado: bool = False, limit: int = 50) -> List[Dict[str, Any]]:
+        """Conta as cargas do owner por status (e por UF de destino, se pedido).
+
+        A agregação e o limite de grupos rodam no banco; só as contagens
+        trafegam. Cada linha traz também total_cargas e total_grupos, os totais
+        de todos os grupos, antes do limite.
         """
+        if not self.pool:
+            raise Exception("Banco não conectado")
+
+        name = "status_estado_summary" if by_estado else "status_summary"
 
         async with self.pool.acquire() as connection:
-            rows = await connection.fetch(query, owner_id, status)
+            rows = await self._fetch(connection, name, owner_id, status, limit)
 
         return [dict(row) for row in rows]
 
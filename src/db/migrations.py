@@ -0,0 +1,264 @@
+import asyncio
+import logging
+import re
+from typing import List, Tuple
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_LOCK_ID = 7_311_001
+
+CREATE_INDEX_PATTERN = re.compile(
+    r"CREATE\s+INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)", re.IGNORECASE)
+
+# (versão, nome, comandos). Cada comando roda isolado, fora de transação,
+# porque CREATE INDEX CONCURRENTLY não pode rodar dentro de um bloco BEGIN.
+# Migrações já aplicadas nunca devem ser editadas; crie uma nova versão.
+MIGRATIONS: List[Tuple[int, str, List[str]]] = [
+    (1, "create_cargas_schema", [
+        """
+        CREATE TABLE IF NOT EXISTS owners (
+            id UUID PRIMARY KEY,
+            documento VARCHAR(20) UNIQUE NOT NULL,
+            nome VARCHAR(255) NOT NULL,
+            email VARCHAR(255) UNIQUE,
+            telefone VARCHAR(20),
+            data_criacao TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS oferta_carga (
+            id UUID PRIMARY KEY,
+            owner_id UUID NOT NULL,
+            codigo VARCHAR(50) UNIQUE NOT NULL,
+            nome_empresa_remetente VARCHAR(255) NOT NULL,
+            endereco_remetente VARCHAR(255) NOT NULL,
+            cidade_remetente VARCHAR(100) NOT NULL,
+            estado_remetente VARCHAR(2) NOT NULL,
+            nome_empresa_destinatario VARCHAR(255) NOT NULL,
+            endereco_destinatario VARCHAR(255) NOT NULL,
+            cidade_destinatario VARCHAR(100) NOT NULL,
+            estado_destinatario VARCHAR(2) NOT NULL,
+            status VARCHAR(50) DEFAULT 'disponivel',
+            data_criacao TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+            pedido_embarcador VARCHAR(255) NOT NULL,
+            FOREIGN KEY (owner_id) REFERENCES owners(id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS carga_documento (
+            id UUID PRIMARY KEY,
+            oferta_carga_id UUID NOT NULL,
+            numero VARCHAR(50) NOT NULL,
+            chave VARCHAR(100) UNIQUE NOT NULL,
+            serie VARCHAR(50),
+            tipo_documento VARCHAR(50) NOT NULL,
+            data_emissao DATE,
+            FOREIGN KEY (oferta_carga_id) REFERENCES oferta_carga(id)
+        )
+        """,
+    ]),
+    (2, "cargas_owner_indexes", [
+        # Chave da paginação de get_cargas_page_by_owner (CARGA_KEYSET_ORDER):
+        # data_criacao nula vira '-infinity' e fica no fim da ordem. Também
+        # atende filtros só por owner_id (prefixo do índice).
+        """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_oferta_carga_owner_keyset
+        ON oferta_carga (owner_id, COALESCE(data_criacao, '-infinity'::timestamptz) DESC, id DESC)
+        """,
+        # Entrega as cargas de um status já ordenadas, para o LIMIT de
+        # search_cargas_by_status.
+        """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_oferta_carga_owner_status_data_criacao
+        ON oferta_carga (owner_id, UPPER(status), data_criacao DESC)
+        """,
+        """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_carga_documento_oferta_carga_id
+        ON carga_documento (oferta_carga_id)
+        """,
+    ]),
+    (3, "cargas_trigram_indexes", [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_oferta_carga_codigo_trgm
+        ON oferta_carga USING gin (UPPER(codigo) gin_trgm_ops)
+        """,
+        """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_oferta_carga_pedido_embarcador_trgm
+        ON oferta_carga USING gin (UPPER(pedido_embarcador) gin_trgm_ops)
+        """,
+        """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_carga_documento_numero_trgm
+        ON carga_documento USING gin (UPPER(numero) gin_trgm_ops)
+        """,
+        """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_carga_documento_chave_trgm
+        ON carga_documento USING gin (UPPER(chave) gin_trgm_ops)
+        """,
+    ]),
+    # Avisa no canal cargas_changed (src.db.cache) o owner cujas cargas mudaram,
+    # para o cache de consultas descartar as entradas dele. Payload "*" = todos.
+    (4, "cargas_change_notify", [
+        """
+        CREATE OR REPLACE FUNCTION notify_oferta_carga_change() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP <> 'INSERT' THEN
+                PERFORM pg_notify('cargas_changed', OLD.owner_id::text);
+            END IF;
+            IF TG_OP <> 'DELETE' THEN
+                PERFORM pg_notify('cargas_changed', NEW.owner_id::text);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE OR REPLACE FUNCTION notify_carga_documento_change() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP <> 'INSERT' THEN
+                PERFORM pg_notify('cargas_changed', oc.owner_id::text)
+                FROM oferta_carga oc WHERE oc.id = OLD.oferta_carga_id;
+            END IF;
+            IF TG_OP <> 'DELETE' THEN
+                PERFORM pg_notify('cargas_changed', oc.owner_id::text)
+                FROM oferta_carga oc WHERE oc.id = NEW.oferta_carga_id;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE OR REPLACE FUNCTION notify_cargas_truncate() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('cargas_changed', '*');
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS trg_oferta_carga_notify ON oferta_carga",
+        """
+        CREATE TRIGGER trg_oferta_carga_notify
+        AFTER INSERT OR UPDATE OR DELETE ON oferta_carga
+        FOR EACH ROW EXECUTE FUNCTION notify_oferta_carga_change()
+        """,
+        "DROP TRIGGER IF EXISTS trg_carga_documento_notify ON carga_documento",
+        """
+        CREATE TRIGGER trg_carga_documento_notify
+        AFTER INSERT OR UPDATE OR DELETE ON carga_documento
+        FOR EACH ROW EXECUTE FUNCTION notify_carga_documento_change()
+        """,
+        "DROP TRIGGER IF EXISTS trg_oferta_carga_truncate_notify ON oferta_carga",
+        """
+        CREATE TRIGGER trg_oferta_carga_truncate_notify
+        AFTER TRUNCATE ON oferta_carga
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_cargas_truncate()
+        """,
+        "DROP TRIGGER IF EXISTS trg_carga_documento_truncate_notify ON carga_documento",
+        """
+        CREATE TRIGGER trg_carga_documento_truncate_notify
+        AFTER TRUNCATE ON carga_documento
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_cargas_truncate()
+        """,
+    ]),
+]
+
+
+async def _ensure_migrations_table(connection: asyncpg.Connection):
+    await connection.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+        )
+    """)
+
+
+async def get_applied_versions(connection: asyncpg.Connection) -> List[int]:
+    await _ensure_migrations_table(connection)
+    rows = await connection.fetch(
+        "SELECT version FROM schema_migrations ORDER BY version")
+    return [row["version"] for row in rows]
+
+
+async def _is_invalid_index(connection: asyncpg.Connection, index_name: str) -> bool:
+    valid = await connection.fetchval(
+        "SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass($1)", index_name)
+    return valid is False
+
+
+async def _drop_invalid_index(connection: asyncpg.Connection, statement: str) -> bool:
+    """Remove o índice do CREATE INDEX CONCURRENTLY se ele ficou INVALID.
+
+    Um build concorrente interrompido deixa o índice inválido no catálogo, e o
+    IF NOT EXISTS pularia o comando para sempre.
+    """
+    match = CREATE_INDEX_PATTERN.search(statement)
+    if not match or not await _is_invalid_index(connection, match.group(1)):
+        return False
+
+    logger.warning("Índice %s inválido, recriando", match.group(1))
+    await connection.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {match.group(1)}")
+    return True
+
+
+async def _repair_indexes(connection: asyncpg.Connection, statements: List[str]):
+    """Recria os índices inválidos de uma migração já aplicada."""
+    for statement in statements:
+        if await _drop_invalid_index(connection, statement):
+            await connection.execute(statement)
+
+
+async def apply_migrations(connection: asyncpg.Connection) -> List[int]:
+    """Aplica, em ordem, as migrações que ainda não constam em schema_migrations.
+
+    Um advisory lock impede que vários workers migrem ao mesmo tempo. Índices
+    deixados INVALID por um CREATE INDEX CONCURRENTLY que falhou são recriados,
+    inclusive os de migrações já aplicadas. Erros são propagados. Retorna as
+    versões aplicadas nesta execução.
+    """
+    applied_now = []
+
+    await connection.execute("SELECT pg_advisory_lock($1)", MIGRATIONS_LOCK_ID)
+    try:
+        applied = set(await get_applied_versions(connection))
+
+        for version, name, statements in MIGRATIONS:
+            if version in applied:
+                await _repair_indexes(connection, statements)
+                continue
+
+            logger.info("Aplicando migração %04d_%s", version, name)
+            for statement in statements:
+                await _drop_invalid_index(connection, statement)
+                await connection.execute(statement)
+
+            await connection.execute(
+                "INSERT INTO schema_migrations (version, name) VALUES ($1, $2)",
+                version, name)
+            applied_now.append(version)
+
+        if applied_now:
+            logger.info("Migrações aplicadas: %s", applied_now)
+        else:
+            logger.info("Banco já está na versão mais recente")
+    finally:
+        await connection.execute("SELECT pg_advisory_unlock($1)", MIGRATIONS_LOCK_ID)
+
+    return applied_now
+
+
+async def main():
+    from src.config import settings
+    from src.db.database import db_manager
+
+    settings.setup_logging()
+    await db_manager.connect()
+    try:
+        async with db_manager.pool.acquire() as connection:
+            await apply_migrations(connection)
+    finally:
+        await db_manager.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,18 @@
+from .metrics import (
+    ASK_STAGE_SECONDS,
+    DB_QUERY_SECONDS,
+    REDIS_OPERATION_SECONDS,
+    StateCollector,
+    timed,
+)
+from .callbacks import MetricsCallbackHandler, metrics_handler
+
+__all__ = [
+    "ASK_STAGE_SECONDS",
+    "DB_QUERY_SECONDS",
+    "REDIS_OPERATION_SECONDS",
+    "StateCollector",
+    "timed",
+    "MetricsCallbackHandler",
+    "metrics_handler",
+]
@@ -0,0 +1,81 @@
+import time
+from typing import Any, Dict, List, Tuple
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import LLMResult
+from .metrics import LLM_CALL_SECONDS, LLM_ERRORS, LLM_TOKENS, TOOL_SECONDS, TOOL_ERRORS
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Mede chamadas ao LLM (duração e tokens) e execuções de ferramentas.
+
+    Passado em `config={"callbacks": [...]}` para valer em toda a execução do
+    agente. Roda inline no event loop: só anota horários e atualiza contadores.
+    """
+
+    run_inline = True
+
+    def __init__(self):
+        self._llm_runs: Dict[UUID, Tuple[float, int]] = {}
+        self._tool_runs: Dict[UUID, Tuple[float, str]] = {}
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[BaseMessage]],
+                            *, run_id: UUID, **kwargs: Any) -> Any:
+        self._llm_runs[run_id] = (time.perf_counter(), 0)
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str],
+                     *, run_id: UUID, **kwargs: Any) -> Any:
+        self._llm_runs[run_id] = (time.perf_counter(), 0)
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> Any:
+        run = self._llm_runs.get(run_id)
+        if run is not None:
+            self._llm_runs[run_id] = (run[0], run[1] + 1)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> Any:
+        run = self._llm_runs.pop(run_id, None)
+        if run is None:
+            return
+
+        start, streamed_chunks = run
+        LLM_CALL_SECONDS.observe(time.perf_counter() - start)
+
+        token_usage = (response.llm_output or {}).get("token_usage")
+        if token_usage:
+            LLM_TOKENS.labels("prompt").inc(token_usage.get("prompt_tokens", 0))
+            LLM_TOKENS.labels("completion").inc(token_usage.get("completion_tokens", 0))
+        elif streamed_chunks:
+            # Em streaming a OpenAI não informa o uso; cada chunk é ~1 token da resposta.
+            LLM_TOKENS.labels("completion").inc(streamed_chunks)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> Any:
+        self._llm_runs.pop(run_id, None)
+        LLM_ERRORS.inc()
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str,
+                      *, run_id: UUID, **kwargs: Any) -> Any:
+        self._tool_runs[run_id] = (time.perf_counter(), serialized.get("name", "desconhecida"))
+
+    def on_tool_end(self, output: str, *, run_id: UUID, **kwargs: Any) -> Any:
+        run = self._tool_runs.pop(run_id, None)
+        if run is None:
+            return
+
+        start, tool = run
+        TOOL_SECONDS.labels(tool).observe(time.perf_counter() - start)
+        # As ferramentas devolvem o erro como texto em vez de levantar exceção.
+        if isinstance(output, str) and output.startswith("Erro"):
+            TOOL_ERRORS.labels(tool).inc()
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> Any:
+        run = self._tool_runs.pop(run_id, None)
+        if run is None:
+            return
+
+        start, tool = run
+        TOOL_SECONDS.labels(tool).observe(time.perf_counter() - start)
+        TOOL_ERRORS.labels(tool).inc()
+
+
+metrics_handler = MetricsCallbackHandler()
@@ -0,0 +1,105 @@
+import asyncio
+import functools
+import time
+from typing import Iterator
+from prometheus_client import Counter, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, Metric
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+ASK_STAGE_SECONDS = Histogram(
+    "ask_stage_seconds", "Duração das etapas do /ask",
+    ["stage"], buckets=LATENCY_BUCKETS)
+LLM_CALL_SECONDS = Histogram(
+    "agent_llm_call_seconds", "Duração de cada chamada ao LLM",
+    buckets=LATENCY_BUCKETS)
+LLM_ERRORS = Counter(
+    "agent_llm_errors", "Chamadas ao LLM que falharam")
+LLM_TOKENS = Counter(
+    "agent_llm_tokens", "Tokens do LLM por tipo (prompt, completion)", ["type"])
+TOOL_SECONDS = Histogram(
+    "agent_tool_seconds", "Duração de cada execução de ferramenta",
+    ["tool"], buckets=LATENCY_BUCKETS)
+TOOL_ERRORS = Counter(
+    "agent_tool_errors", "Execuções de ferramenta com erro", ["tool"])
+DB_QUERY_SECONDS = Histogram(
+    "db_query_seconds", "Duração das consultas do DatabaseManager",
+    ["query"], buckets=LATENCY_BUCKETS)
+REDIS_OPERATION_SECONDS = Histogram(
+    "redis_operation_seconds", "Duração das operações de memória e cache no Redis",
+    ["operation"], buckets=LATENCY_BUCKETS)
+
+
+def timed(histogram: Histogram, label: str):
+    """Mede a duração do método (síncrono ou async) no histograma com o label dado."""
+    child = histogram.labels(label)
+
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    child.observe(time.perf_counter() - start)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - start)
+        return wrapper
+
+    return decorator
+
+
+class StateCollector:
+    """Métricas lidas só na coleta do /metrics: pool do banco e contadores dos caches.
+
+    Não custa nada no caminho das requisições; os valores vêm do estado que o
+    pool e os caches já mantêm.
+    """
+
+    def __init__(self, db_manager, ai_agent):
+        self.db_manager = db_manager
+        self.ai_agent = ai_agent
+
+    def collect(self) -> Iterator[Metric]:
+        pool = self.db_manager.pool
+        if pool is not None:
+            connections = GaugeMetricFamily(
+                "db_pool_connections", "Conexões do pool do banco por estado", labels=["state"])
+            size = pool.get_size()
+            idle = pool.get_idle_size()
+            connections.add_metric(["open"], size)
+            connections.add_metric(["idle"], idle)
+            connections.add_metric(["in_use"], size - idle)
+            connections.add_metric(["max"], pool.get_max_size())
+            yield connections
+
+        caches = {"queries": self.db_manager.cache.stats()}
+        if self.ai_agent.answer_cache:
+            caches["answers"] = self.ai_agent.answer_cache.stats()
+
+        lookups = CounterMetricFamily(
+            "cache_lookups", "Consultas aos caches por resultado", labels=["cache", "result"])
+        hit_ratio = GaugeMetricFamily(
+            "cache_hit_ratio", "Proporção de acertos dos caches", labels=["cache"])
+        for cache, stats in caches.items():
+            lookups.add_metric([cache, "hit"], stats["hits"])
+            lookups.add_metric([cache, "miss"], stats["misses"])
+            hit_ratio.add_metric([cache], stats["hit_ratio"])
+        yield lookups
+        yield hit_ratio
+
+        query_cache = caches["queries"]
+        yield GaugeMetricFamily(
+            "query_cache_entries", "Entradas no cache de consultas", value=query_cache["entries"])
+        yield CounterMetricFamily(
+            "query_cache_evictions", "Entradas removidas por falta de espaço", value=query_cache["evictions"])
+        yield CounterMetricFamily(
+            "query_cache_invalidations", "Invalidações por mudança nas cargas", value=query_cache["invalidations"])
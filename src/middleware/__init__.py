@@ -1,3 +1,4 @@
 from .exception_handler import global_exception_handler
+from .request_id import RequestIdMiddleware
 
-__all__ = ["global_exception_handler"]
+__all__ = ["global_exception_handler", "RequestIdMiddleware"]
@@ -6,7 +6,7 @@ logger = logging.getLogger(__name__)
 
 
 async def global_exception_handler(request: Request, exc: Exception):
-    logger.error(f"Exceção não tratada: {exc}")
+    logger.error("Exceção não tratada: %s", exc)
     return JSONResponse(
         status_code=500,
         content={
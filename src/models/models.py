@@ -8,6 +8,16 @@ class AskRequest(BaseModel):
     owner_id: str = Field(..., description="ID do proprietário das cargas")
     user_id: Optional[str] = Field(
         None, description="ID do usuário (não utilizado no momento)")
+    idempotency_key: Optional[str] = Field(
+        None, description="Chave do cliente para reenvios: a mesma chave na conversa devolve o resultado já calculado")
+
+
+class DocumentoInfo(BaseModel):
+    numero: Optional[str] = None
+    chave: Optional[str] = None
+    serie: Optional[str] = None
+    tipo_documento: Optional[str] = None
+    data_emissao: Optional[date] = None
 
 
 class CargaInfo(BaseModel):
@@ -32,6 +42,27 @@ class CargaInfo(BaseModel):
     nome_owner: Optional[str] = None
     documento_owner: Optional[str] = None
     email_owner: Optional[str] = None
+    documentos: List[DocumentoInfo] = []
+
+
+class CargaResult(BaseModel):
+    oferta_id: str
+    codigo: Optional[str] = None
+    nome_empresa_remetente: Optional[str] = None
+    endereco_remetente: Optional[str] = None
+    cidade_remetente: Optional[str] = None
+    estado_remetente: Optional[str] = None
+    nome_empresa_destinatario: Optional[str] = None
+    endereco_destinatario: Optional[str] = None
+    cidade_destinatario: Optional[str] = None
+    estado_destinatario: Optional[str] = None
+    status: Optional[str] = None
+    pedido_embarcador: Optional[str] = None
+    data_criacao_carga: Optional[datetime] = None
+    nome_owner: Optional[str] = None
+    documento_owner: Optional[str] = None
+    email_owner: Optional[str] = None
+    documentos: List[DocumentoInfo] = []
 
 
 class AskResponse(BaseModel):
@@ -44,6 +75,24 @@ class AskResponse(BaseModel):
     cargas: Optional[List[CargaInfo]] = None
 
 
+class AskBatchRequest(BaseModel):
+    items: List[AskRequest] = Field(..., description="Perguntas a processar")
+
+
+class AskBatchItemResult(BaseModel):
+    index: int
+    success: bool
+    result: Optional[AskResponse] = None
+    error: Optional[str] = None
+
+
+class AskBatchResponse(BaseModel):
+    total: int
+    succeeded: int
+    failed: int
+    results: List[AskBatchItemResult]
+
+
 class HealthResponse(BaseModel):
     status: str
     message: str